@@ -0,0 +1,44 @@
+"""
+Benchmark generating a fake service day against fleet size, with `ProviderDataGenerator.service_day()`
+and the vectorized `FleetSimulator.service_day()`.
+
+Usage:
+
+    python benchmarks/fake.py [fleet size ...]
+"""
+
+from datetime import datetime, timezone
+from mds.fake import ProviderDataGenerator
+from shapely.geometry import Point
+import sys
+import time
+
+
+def generator():
+    """
+    A generator for a ~5km radius around Santa Monica, without fetching the schema.
+    """
+    boundary = Point(-118.49, 34.02).buffer(0.05)
+    return ProviderDataGenerator(boundary=boundary, speed=3.5,
+                                 vehicle_types=["bicycle", "scooter"], propulsion_types=["human", "electric"])
+
+def timed(service_day, devices):
+    """
+    Time a 7am to 10pm :service_day: for :devices:, returning (seconds, records).
+    """
+    date = datetime(2019, 1, 1, tzinfo=timezone.utc)
+    start = time.perf_counter()
+    status_changes, trips = service_day(devices, date, 7, 22, 0.3)
+    return time.perf_counter() - start, len(status_changes) + len(trips)
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [1000, 5000, 10000, 50000]
+    gen = generator()
+
+    for N in sizes:
+        devices = gen.devices(N, "Benchmark")
+
+        for name, service_day in [("generator", gen.service_day), ("fleet", gen.fleet().service_day)]:
+            seconds, records = timed(service_day, [dict(d) for d in devices])
+            print(f"{name} {N:>6} devices: {seconds:7.2f}s, {records / seconds:,.0f} records/s")
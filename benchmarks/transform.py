@@ -0,0 +1,79 @@
+"""
+Benchmark the status_changes and trips staging transforms against the previous row-wise `before_load`,
+with the standard library JSON encoder and, when it's installed, `orjson`.
+
+Usage:
+
+    python benchmarks/transform.py [rows]
+"""
+
+import json
+from mds.db import transform
+from mds.db.transform import RecordTransform
+import pandas as pd
+import sys
+import time
+import uuid
+
+
+def feature(i):
+    return dict(type="Feature", properties=dict(timestamp=1546300800 + i),
+                geometry=dict(type="Point", coordinates=[-118.49 + i * 1e-6, 34.02]))
+
+def status_changes(N):
+    return pd.DataFrame.from_records([
+        dict(provider_id=str(uuid.uuid4()), device_id=str(uuid.uuid4()), vehicle_type="scooter",
+             propulsion_type=["electric"], event_type="available", event_type_reason="user_drop_off",
+             event_time=1546300800 + i, event_location=feature(i),
+             associated_trips=[str(uuid.uuid4())] if i % 2 else None)
+        for i in range(N)])
+
+def trips(N):
+    return pd.DataFrame.from_records([
+        dict(provider_id=str(uuid.uuid4()), device_id=str(uuid.uuid4()), trip_id=str(uuid.uuid4()),
+             vehicle_type="scooter", propulsion_type=["electric"], start_time=1546300800 + i,
+             end_time=1546301800 + i, route=dict(type="FeatureCollection", features=[feature(i), feature(i + 1)]))
+        for i in range(N)])
+
+def previous_status_changes(df):
+    """
+    The status_changes `before_load` before `RecordTransform`.
+    """
+    df["event_location"] = df["event_location"].apply(json.dumps)
+    df = df.reindex(columns=set(df.columns.tolist() + ["battery_pct", "associated_trips"]))
+    df[["associated_trips"]] = df[["associated_trips"]].astype("object")
+    df["associated_trips"] = df["associated_trips"].apply(lambda d: d if isinstance(d, list) else [])
+    return df
+
+def previous_trips(df):
+    """
+    The trips `before_load` before `RecordTransform`.
+    """
+    df["route"] = df["route"].apply(json.dumps)
+    return df.reindex(columns=set(df.columns.tolist() + ["parking_verification_url", "standard_cost", "actual_cost"]))
+
+def timed(transform, df):
+    """
+    Time applying :transform: to a copy of :df:, returning rows/s.
+    """
+    df = df.copy()
+    start = time.perf_counter()
+    transform(df)
+    return len(df) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    for name, data, previous, current in [
+        ("status_changes", status_changes(rows), previous_status_changes, RecordTransform.StatusChanges()),
+        ("trips", trips(rows), previous_trips, RecordTransform.Trips())
+    ]:
+        print(f"{name} previous: {timed(previous, data):,.0f} rows/s")
+
+        codec = transform.orjson
+        if codec is not None:
+            print(f"{name} current (orjson): {timed(current, data):,.0f} rows/s")
+        transform.orjson = None
+        print(f"{name} current (json): {timed(current, data):,.0f} rows/s")
+        transform.orjson = codec
@@ -50,11 +50,11 @@ class ProviderClient(OAuthClientCredentialsAuth):
 
         return url
 
-    def _request(self, providers, endpoint, params, paging):
+    def _iter_pages(self, providers, endpoint, params, paging):
         """
         Internal helper for sending requests.
 
-        Returns a dict of provider => payload(s).
+        Yields a tuple of provider, payload for each page of data, as it is received.
         """
         def __describe(res):
             """
@@ -65,8 +65,8 @@ class ProviderClient(OAuthClientCredentialsAuth):
             for k,v in res.headers.items():
                 print(f"{k}: {v}")
 
-            if r.status_code is not 200:
-                print(r.text)
+            if res.status_code != 200:
+                print(res.text)
 
         def __has_data(page):
             """
@@ -86,9 +86,6 @@ class ProviderClient(OAuthClientCredentialsAuth):
         # create a request url for each provider
         urls = [self._build_url(p, endpoint) for p in providers]
 
-        # keyed by provider
-        results = {}
-
         for i in range(len(providers)):
             provider, url = providers[i], urls[i]
 
@@ -98,32 +95,47 @@ class ProviderClient(OAuthClientCredentialsAuth):
             # get the initial page of data
             r = session.get(url, params=params)
 
-            if r.status_code is not 200:
+            if r.status_code != 200:
                 __describe(r)
                 continue
 
             this_page = r.json()
 
-            # track the list of pages per provider
-            results[provider] = [this_page] if __has_data(this_page) else []
+            if __has_data(this_page):
+                yield provider, this_page
 
             # get subsequent pages of data
             next_url = __next_url(this_page)
             while paging and next_url:
                 r = session.get(next_url)
 
-                if r.status_code is not 200:
+                if r.status_code != 200:
                     __describe(r)
                     break
 
                 this_page = r.json()
 
                 if __has_data(this_page):
-                    results[provider].append(this_page)
+                    yield provider, this_page
                     next_url = __next_url(this_page)
                 else:
                     break
 
+    def _request(self, providers, endpoint, params, paging):
+        """
+        Internal helper for sending requests.
+
+        Returns a dict of provider => payload(s).
+        """
+        # keyed by provider
+        results = {}
+
+        for provider in providers:
+            results[provider] = []
+
+        for provider, page in self._iter_pages(providers, endpoint, params, paging):
+            results[provider].append(page)
+
         return results
 
     def _date_format(self, dt):
@@ -139,6 +151,7 @@ class ProviderClient(OAuthClientCredentialsAuth):
         end_time=None,
         bbox=None,
         paging=True,
+        stream=False,
         **kwargs):
         """
         Request Status Changes data. Returns a dict of provider => list of status_changes payload(s)
@@ -164,6 +177,9 @@ class ProviderClient(OAuthClientCredentialsAuth):
 
             - `paging`: True (default) to follow paging and request all available data.
                         False to request only the first page.
+
+            - `stream`: False (default) to return once all pages have been received.
+                        True to return a generator of (provider, payload) tuples, yielded as each page is received.
         """
         if providers is None:
             providers = self.providers
@@ -181,6 +197,9 @@ class ProviderClient(OAuthClientCredentialsAuth):
         }
 
         # make the request(s)
+        if stream:
+            return self._iter_pages(providers, mds.STATUS_CHANGES, params, paging)
+
         status_changes = self._request(providers, mds.STATUS_CHANGES, params, paging)
 
         return status_changes
@@ -194,6 +213,7 @@ class ProviderClient(OAuthClientCredentialsAuth):
         end_time=None,
         bbox=None,
         paging=True,
+        stream=False,
         **kwargs):
         """
         Request Trips data. Returns a dict of provider => list of trips payload(s).
@@ -223,6 +243,9 @@ class ProviderClient(OAuthClientCredentialsAuth):
 
             - `paging`: True (default) to follow paging and request all available data.
                         False to request only the first page.
+
+            - `stream`: False (default) to return once all pages have been received.
+                        True to return a generator of (provider, payload) tuples, yielded as each page is received.
         """
         if providers is None:
             providers = self.providers
@@ -240,6 +263,9 @@ class ProviderClient(OAuthClientCredentialsAuth):
         }
 
         # make the request(s)
+        if stream:
+            return self._iter_pages(providers, mds.TRIPS, params, paging)
+
         trips = self._request(providers, mds.TRIPS, params, paging)
 
         return trips
@@ -2,5 +2,6 @@
 Work with MDS Provider data.
 """
 
-from mds.db.load import ProviderDataLoader
+from mds.db.load import ProviderDataLoader, ProviderDataLoadError
+from mds.db.read import ProviderDataReader
 
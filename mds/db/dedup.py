@@ -0,0 +1,161 @@
+"""
+Skip MDS Provider records that were already loaded.
+"""
+
+import math
+import mds
+from mds.db import sql
+import numpy as np
+import pandas as pd
+import sqlalchemy
+import threading
+
+
+def _epoch_millis(values):
+    """
+    Helper converts Unix seconds or datetimes (naive datetimes are UTC) to integer milliseconds.
+    """
+    values = pd.Series(values)
+
+    if pd.api.types.is_numeric_dtype(values):
+        return (values.astype(float) * 1000).round().astype(np.int64)
+
+    times = pd.to_datetime(values, utc=True)
+    return (times - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)
+
+def key_hashes(df, record_type):
+    """
+    Compute a 64-bit hash of the uniqueness key of each :record_type: record in :df:
+        - `trip_id` for trips
+        - `device_id`, `event_time` and `event_type` for status_changes
+
+    :returns: A uint64 NumPy array.
+    """
+    if record_type == mds.STATUS_CHANGES:
+        keys = df["device_id"].astype(str).str.lower().values + "|" + \
+               _epoch_millis(df["event_time"]).astype(str).values + "|" + \
+               df["event_type"].astype(str).values
+    elif record_type == mds.TRIPS:
+        keys = df["trip_id"].astype(str).str.lower().values
+    else:
+        raise ValueError(f"Invalid record_type '{record_type}'.")
+
+    return pd.util.hash_array(np.asarray(keys, dtype=object), categorize=False)
+
+
+class KeyIndex():
+    """
+    An exact, in-memory set of record key hashes.
+    """
+
+    def __init__(self):
+        self.keys = set()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, hashes):
+        """
+        Add the key :hashes: to this index.
+        """
+        with self.lock:
+            self.keys.update(hashes.tolist())
+
+    def contains(self, hashes):
+        """
+        :returns: A boolean NumPy array, True where the key hash is in this index.
+        """
+        with self.lock:
+            return np.array([h in self.keys for h in hashes.tolist()], dtype=bool)
+
+
+class BloomFilter():
+    """
+    A compact, probabilistic set of record key hashes.
+
+    Keys that were never added are reported as present with probability :error_rate:,
+    so that fraction of new records would be skipped.
+    """
+
+    def __init__(self, capacity, error_rate=1e-6):
+        """
+        Initialize a new `BloomFilter` sized for :capacity: keys at the given :error_rate:.
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2)**2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def _positions(self, hashes):
+        """
+        Helper computes the bit positions of each of the key :hashes:, using double hashing.
+
+        :returns: A uint64 NumPy array of shape (len(hashes), number of hash functions).
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        i = np.arange(self.hashes, dtype=np.uint64)
+        return (h1[:, None] + i[None, :] * h2[:, None]) % np.uint64(self.size)
+
+    def add(self, hashes):
+        """
+        Add the key :hashes: to this filter.
+        """
+        positions = self._positions(hashes).ravel()
+        with self.lock:
+            np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                             (1 << (positions & np.uint64(7))).astype(np.uint8))
+            self.count += len(hashes)
+
+    def contains(self, hashes):
+        """
+        :returns: A boolean NumPy array, True where the key hash is (probably) in this filter.
+        """
+        positions = self._positions(hashes)
+        with self.lock:
+            bytes_ = self.bits[positions >> np.uint64(3)]
+        return ((bytes_ >> (positions & np.uint64(7)).astype(np.uint8)) & 1).all(axis=1)
+
+
+def seed(index, engine, record_type, table=None, since=None, chunksize=100000):
+    """
+    Add the keys of the :record_type: records already in :table: to the :index:, reading them
+    in chunks of :chunksize: rows through the `sqlalchemy.engine.Engine` :engine:.
+
+    :since: is an optional Unix timestamp (seconds) limiting the keys to more recent records.
+
+    :returns: The :index:.
+    """
+    query = sqlalchemy.text(sql.select_keys(record_type, table=table, since=since))
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True)
+        for chunk in pd.read_sql(query, conn, chunksize=chunksize):
+            index.add(key_hashes(chunk, record_type))
+
+    return index
+
+def filter_known(df, record_type, index):
+    """
+    Remove the records of :df: whose keys are in the :index:, and duplicate keys within :df:.
+
+    Return a tuple:
+        - the DataFrame of new records
+        - the key hashes of the new records
+    """
+    hashes = key_hashes(df, record_type)
+    keep = ~pd.Series(hashes).duplicated().values & ~index.contains(hashes)
+
+    return df[keep], hashes[keep]
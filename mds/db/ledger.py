@@ -0,0 +1,91 @@
+"""
+Skip MDS Provider sources (files and data pages) that were already loaded.
+"""
+
+import hashlib
+import json
+from mds.db import sql
+import sqlalchemy
+import threading
+
+
+def file_digest(path, chunksize=1 << 20):
+    """
+    Compute the SHA-256 hex digest of the contents of the file at :path:, without parsing it.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunksize), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def page_digest(page):
+    """
+    Compute the SHA-256 hex digest of the data :page: (a dict), independent of its key order.
+    """
+    content = json.dumps(page, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class LoadLedger():
+    """
+    A table recording each source loaded, by its description and the digest of its contents.
+
+    A source is skipped when the same description and contents were loaded before, e.g.
+    an unchanged file path, or a provider's data page with the same contents.
+
+    The table is created on first use, if it doesn't already exist.
+    """
+
+    def __init__(self, engine, table="load_ledger"):
+        """
+        Initialize a new `LoadLedger` in :table: using the `sqlalchemy.engine.Engine` :engine:.
+        """
+        self.engine = engine
+        self.table = table
+        self.sources = {}
+        self.lock = threading.Lock()
+        self._created = False
+
+    def create(self):
+        """
+        Create the ledger table, if it doesn't already exist.
+        """
+        with self.engine.begin() as conn:
+            conn.execute(sqlalchemy.text(sql.create_ledger_table(self.table)))
+        self._created = True
+
+    def _sources(self, record_type):
+        """
+        Get the set of (source, digest) loaded for :record_type:, reading it from the table once.
+        """
+        if record_type not in self.sources:
+            if not self._created:
+                self.create()
+            with self.engine.connect() as conn:
+                rows = conn.execute(sqlalchemy.text(sql.select_ledger(self.table)), dict(record_type=record_type))
+                self.sources[record_type] = set((row[0], row[1]) for row in rows)
+        return self.sources[record_type]
+
+    def contains(self, record_type, source, digest):
+        """
+        Check if the :source: with contents :digest: was already loaded for :record_type:.
+        """
+        with self.lock:
+            return (source, digest) in self._sources(record_type)
+
+    def add(self, record_type, entries):
+        """
+        Record the :entries: (a list of tuples of source, digest, record count) as loaded for :record_type:.
+        """
+        entries = list(entries)
+        if len(entries) == 0:
+            return
+
+        params = [dict(record_type=record_type, source=s, digest=d, records=n) for s, d, n in entries]
+        with self.lock:
+            if not self._created:
+                self.create()
+            with self.engine.begin() as conn:
+                conn.execute(sqlalchemy.text(sql.insert_ledger(self.table)), params)
+            self._sources(record_type).update((s, d) for s, d, _ in entries)
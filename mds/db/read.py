@@ -0,0 +1,119 @@
+"""
+Read MDS Provider data back out of a database.
+"""
+
+from datetime import datetime, timezone
+import mds
+from mds.db import sql
+from mds.db.load import data_engine
+from mds.geometry import RouteArray
+from mds.providers import Provider
+import numpy as np
+import pandas as pd
+import sqlalchemy
+
+
+class ProviderDataReader():
+    """
+    A class for reading MDS Provider data in bounded-memory chunks.
+    """
+
+    CATEGORY_COLS = ["provider_id", "provider_name", "device_id", "vehicle_id",
+                     "vehicle_type", "event_type", "event_type_reason"]
+
+    TIME_COLS = ["event_time", "start_time", "end_time"]
+
+    def __init__(self, uri=None, **kwargs):
+        """
+        Initialize a new `ProviderDataReader` using the same connection methods as `ProviderDataLoader`.
+
+        Optionally pass :postgis: as True when `event_location` and `route` are PostGIS geometry columns.
+        """
+        self.postgis = kwargs.pop("postgis", False)
+
+        if "engine" in kwargs:
+            self.engine = kwargs["engine"]
+        else:
+            self.engine = data_engine(uri=uri, **kwargs)
+
+    def _utc(self, t):
+        """
+        Helper converts :t: (datetime or Unix seconds) to a naive UTC datetime, matching the stored times.
+        """
+        if not isinstance(t, datetime):
+            t = datetime.fromtimestamp(t, timezone.utc)
+        if t.tzinfo is not None:
+            t = t.astimezone(timezone.utc).replace(tzinfo=None)
+        return t
+
+    def _typed(self, df):
+        """
+        Helper converts the columns of the chunk :df: to compact types.
+        """
+        for col in df.columns:
+            if col in self.CATEGORY_COLS:
+                df[col] = df[col].astype("category")
+            elif col in self.TIME_COLS:
+                df[col] = pd.to_datetime(df[col]).dt.tz_localize("UTC").astype("datetime64[ms, UTC]")
+            elif col in ["event_lon", "event_lat", "battery_pct"]:
+                df[col] = df[col].astype(np.float32)
+        return df
+
+    def read(self, record_type, table=None, columns=None, start_time=None, end_time=None,
+             providers=None, chunksize=100000):
+        """
+        Read :record_type: records from :table: (the default is the :record_type:) through a
+        server-side cursor, yielding DataFrames of at most :chunksize: rows.
+
+        :columns: is an optional list of columns to read.
+
+        :start_time: and :end_time: optionally limit the records to [start_time, end_time) of the record's
+        primary time column (`event_time` or `start_time`), given as datetimes or Unix seconds.
+
+        :providers: is an optional list of `Provider` or `provider_id` to read.
+
+        Chunks have categoricals for enums and repeating ids, `datetime64[ms, UTC]` times and
+        float32 `event_lon` and `event_lat` columns in place of `event_location`. Trips chunks
+        are tuples of the DataFrame and a `RouteArray` of the chunk's routes, or None if `route`
+        wasn't read.
+        """
+        params = {}
+        if start_time is not None:
+            params["start_time"] = self._utc(start_time)
+        if end_time is not None:
+            params["end_time"] = self._utc(end_time)
+        if providers is not None:
+            params["providers"] = [str(p.provider_id if isinstance(p, Provider) else p) for p in providers]
+
+        query = sql.select_records(record_type, table=table, columns=columns,
+                                   start_time=start_time, end_time=end_time, providers=providers,
+                                   postgis=self.postgis)
+
+        with self.engine.connect() as conn:
+            conn = conn.execution_options(stream_results=True)
+            for chunk in pd.read_sql(sqlalchemy.text(query), conn, params=params, chunksize=chunksize):
+                chunk = self._typed(chunk)
+
+                if record_type != mds.TRIPS:
+                    yield chunk
+                    continue
+
+                routes = None
+                if "route" in chunk:
+                    values = chunk.pop("route").values
+                    routes = RouteArray.from_wkb([bytes(v) for v in values]) if self.postgis \
+                        else RouteArray.from_geojson(values)
+
+                yield chunk, routes
+
+    def read_status_changes(self, table=mds.STATUS_CHANGES, **kwargs):
+        """
+        Read status_changes in chunks, see `read()`.
+        """
+        return self.read(mds.STATUS_CHANGES, table=table, **kwargs)
+
+    def read_trips(self, table=mds.TRIPS, **kwargs):
+        """
+        Read trips in chunks, see `read()`.
+        """
+        return self.read(mds.TRIPS, table=table, **kwargs)
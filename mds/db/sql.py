@@ -1,15 +1,49 @@
 """
 SQL scripts for MDS Provider database CRUD.
+
+Statements target PostgreSQL. The statements that DuckDB also runs (the table and type definitions,
+and the inserts) take a :dialect: of `postgresql` (the default) or `duckdb`; DuckDB accepts the same
+casts, `to_timestamp()` and `ON CONFLICT` clauses.
 """
 
+from datetime import date
 import mds
 
 
-def insert_status_changes_from(source_table, dest_table=mds.STATUS_CHANGES):
+def _geometry(col, postgis):
+    """
+    Helper returns the expression converting the staged :col: to its destination type:
+    hex EWKB to geometry when :postgis: is True, otherwise JSON text to JSON.
+    """
+    return f"ST_GeomFromEWKB(decode({col}, 'hex'))" if postgis else f"{col}::JSON"
+
+def _order_by(cols, dialect):
+    """
+    Helper returns an ORDER BY clause for the :cols: on PostgreSQL, so that concurrent inserts take
+    their row locks in the same order. DuckDB doesn't lock rows, so nothing is returned for it.
+    """
+    return "" if dialect == "duckdb" else f"ORDER BY {cols}"
+
+def _returning(cols):
+    """
+    Helper returns a RETURNING clause for the list of :cols:, or nothing if None.
+    """
+    return "" if cols is None else "RETURNING " + ", ".join(cols)
+
+def insert_status_changes_from(source_table, dest_table=mds.STATUS_CHANGES, postgis=False, returning=None,
+                               dialect="postgresql"):
     """
     Generate an INSERT INTO statement from :source_table: to the Status Changes table, that
     ignores records that conflict based on existing uniqueness constraints.
+
+    On PostgreSQL, rows are inserted in key order, so concurrent inserts take their locks in the same order.
+
+    :postgis: when True, the staged geometry is hex EWKB for a PostGIS geometry column.
+
+    :returning: is an optional list of columns of the inserted rows to return.
     """
+    event_location = _geometry("event_location", postgis)
+
     return f"""
     INSERT INTO "{dest_table}"
     (
@@ -36,18 +70,28 @@ def insert_status_changes_from(source_table, dest_table=mds.STATUS_CHANGES):
         event_type::event_types,
         event_type_reason::event_type_reasons,
         to_timestamp(event_time) AT TIME ZONE 'UTC',
-        event_location::JSON,
+        {event_location},
         battery_pct,
         associated_trips::UUID[]
     FROM "{source_table}"
-    ON CONFLICT DO NOTHING;
+    {_order_by("device_id, event_time, event_type", dialect)}
+    ON CONFLICT DO NOTHING
+    {_returning(returning)};
     """
 
-def insert_trips_from(source_table, dest_table=mds.TRIPS):
+def insert_trips_from(source_table, dest_table=mds.TRIPS, postgis=False, returning=None, dialect="postgresql"):
     """
     Generate an INSERT INTO statement from :source_table: to the Trips table, that
     ignores records that conflict based on existing uniqueness constraints.
+
+    On PostgreSQL, rows are inserted in key order, so concurrent inserts take their locks in the same order.
+
+    :postgis: when True, the staged geometry is hex EWKB for a PostGIS geometry column.
+
+    :returning: is an optional list of columns of the inserted rows to return.
     """
+    route = _geometry("route", postgis)
+
     return f"""
     INSERT INTO "{dest_table}"
     (
@@ -78,7 +122,7 @@ def insert_trips_from(source_table, dest_table=mds.TRIPS):
         trip_id::UUID,
         trip_duration,
         trip_distance,
-        route::JSON,
+        {route},
         accuracy,
         to_timestamp(start_time) AT TIME ZONE 'UTC',
         to_timestamp(end_time) AT TIME ZONE 'UTC',
@@ -86,6 +130,404 @@ def insert_trips_from(source_table, dest_table=mds.TRIPS):
         standard_cost,
         actual_cost
     FROM "{source_table}"
+    {_order_by("trip_id", dialect)}
+    ON CONFLICT DO NOTHING
+    {_returning(returning)};
+    """
+
+
+def copy_from(table, columns, null="\\N"):
+    """
+    Generate a `COPY FROM STDIN` statement loading CSV text of the :columns: into :table:, see
+    `mds.db.transform.copy_csv()`.
+
+    :null: is the string marking missing values.
+    """
+    cols = ", ".join(f'"{c}"' for c in columns)
+    return f"""COPY "{table}" ({cols}) FROM STDIN WITH (FORMAT csv, NULL '{null}')"""
+
+def select_keys(record_type, table=None, since=None):
+    """
+    Generate a SELECT statement for the uniqueness keys of the :record_type: records in :table:
+    (the default is the :record_type:), in the format of `mds.db.dedup.key_hashes()`.
+
+    :since: is an optional Unix timestamp (seconds) limiting the keys to more recent records.
+    """
+    table = table or record_type
+
+    if record_type == mds.STATUS_CHANGES:
+        time_col = "event_time"
+        cols = "device_id::TEXT AS device_id, extract(epoch FROM event_time) AS event_time, event_type::TEXT AS event_type"
+    else:
+        time_col = "start_time"
+        cols = "trip_id::TEXT AS trip_id"
+
+    where = "" if since is None else f"WHERE {time_col} >= to_timestamp({float(since)}) AT TIME ZONE 'UTC'"
+
+    return f"""
+    SELECT {cols}
+    FROM "{table}"
+    {where};
+    """
+
+def create_enum(name, values, dialect="postgresql"):
+    """
+    Generate a statement creating the enum type :name: with :values:, if it doesn't already exist.
+    """
+    labels = ", ".join("'" + str(v).replace("'", "''") + "'" for v in values)
+
+    if dialect == "duckdb":
+        return f"CREATE TYPE IF NOT EXISTS {name} AS ENUM ({labels});"
+
+    return f"""
+    DO $$ BEGIN
+        CREATE TYPE {name} AS ENUM ({labels});
+    EXCEPTION
+        WHEN duplicate_object THEN NULL;
+    END $$;
+    """
+
+def create_types(vehicle_types, propulsion_types, event_types, event_type_reasons, dialect="postgresql"):
+    """
+    Generate the statements creating the enum types used by the Status Changes and Trips tables.
+    """
+    return [
+        create_enum("vehicle_types", vehicle_types, dialect=dialect),
+        create_enum("propulsion_types", propulsion_types, dialect=dialect),
+        create_enum("event_types", event_types, dialect=dialect),
+        create_enum("event_type_reasons", event_type_reasons, dialect=dialect)
+    ]
+
+def create_status_changes_table(table=mds.STATUS_CHANGES, postgis=False, dialect="postgresql"):
+    """
+    Generate the statements creating the Status Changes :table: and its indexes, declaratively
+    partitioned by range of `event_time`. See `create_partition()`.
+
+    The uniqueness constraint is the conflict target of `insert_status_changes_from()`.
+
+    :postgis: when True, `event_location` is a PostGIS Point with a GiST index.
+
+    With the `duckdb` :dialect:, the table isn't partitioned and has no secondary indexes;
+    DuckDB skips row groups by the min/max of each column instead.
+    """
+    location = "geometry(Point, 4326)" if postgis else "JSON"
+    partition = "" if dialect == "duckdb" else "PARTITION BY RANGE (event_time)"
+    statements = [
+        f"""
+        CREATE TABLE IF NOT EXISTS "{table}" (
+            provider_id UUID NOT NULL,
+            provider_name TEXT NOT NULL,
+            device_id UUID NOT NULL,
+            vehicle_id TEXT NOT NULL,
+            vehicle_type vehicle_types NOT NULL,
+            propulsion_type propulsion_types[] NOT NULL,
+            event_type event_types NOT NULL,
+            event_type_reason event_type_reasons NOT NULL,
+            event_time TIMESTAMP NOT NULL,
+            event_location {location} NOT NULL,
+            battery_pct FLOAT,
+            associated_trips UUID[],
+            CONSTRAINT "unique_{table}_event" UNIQUE (device_id, event_time, event_type)
+        )
+        {partition};
+        """
+    ]
+
+    if dialect == "duckdb":
+        return statements
+
+    statements += [
+        f'CREATE INDEX IF NOT EXISTS "{table}_event_time_brin" ON "{table}" USING BRIN (event_time);',
+        f'CREATE INDEX IF NOT EXISTS "{table}_provider_event_time" ON "{table}" (provider_id, event_time);'
+    ]
+
+    if postgis:
+        statements.append(f'CREATE INDEX IF NOT EXISTS "{table}_event_location_gist" ON "{table}" USING GIST (event_location);')
+
+    return statements
+
+def create_trips_table(table=mds.TRIPS, postgis=False, dialect="postgresql"):
+    """
+    Generate the statements creating the Trips :table: and its indexes, declaratively
+    partitioned by range of `start_time`. See `create_partition()`.
+
+    The uniqueness constraint is the conflict target of `insert_trips_from()`; it includes
+    `start_time` because unique constraints on partitioned tables must include the partition key.
+
+    :postgis: when True, `route` is a PostGIS LineString with a GiST index.
+
+    With the `duckdb` :dialect:, the table isn't partitioned and has no secondary indexes.
+    """
+    route = "geometry(LineString, 4326)" if postgis else "JSON"
+    partition = "" if dialect == "duckdb" else "PARTITION BY RANGE (start_time)"
+    statements = [
+        f"""
+        CREATE TABLE IF NOT EXISTS "{table}" (
+            provider_id UUID NOT NULL,
+            provider_name TEXT NOT NULL,
+            device_id UUID NOT NULL,
+            vehicle_id TEXT NOT NULL,
+            vehicle_type vehicle_types NOT NULL,
+            propulsion_type propulsion_types[] NOT NULL,
+            trip_id UUID NOT NULL,
+            trip_duration INTEGER NOT NULL,
+            trip_distance INTEGER NOT NULL,
+            route {route} NOT NULL,
+            accuracy INTEGER NOT NULL,
+            start_time TIMESTAMP NOT NULL,
+            end_time TIMESTAMP NOT NULL,
+            parking_verification_url TEXT,
+            standard_cost INTEGER,
+            actual_cost INTEGER,
+            CONSTRAINT "unique_{table}_trip" UNIQUE (trip_id, start_time)
+        )
+        {partition};
+        """
+    ]
+
+    if dialect == "duckdb":
+        return statements
+
+    statements += [
+        f'CREATE INDEX IF NOT EXISTS "{table}_start_time_brin" ON "{table}" USING BRIN (start_time);',
+        f'CREATE INDEX IF NOT EXISTS "{table}_provider_start_time" ON "{table}" (provider_id, start_time);',
+        f'CREATE INDEX IF NOT EXISTS "{table}_device_start_time" ON "{table}" (device_id, start_time);'
+    ]
+
+    if postgis:
+        statements.append(f'CREATE INDEX IF NOT EXISTS "{table}_route_gist" ON "{table}" USING GIST (route);')
+
+    return statements
+
+def partition_name(table, month):
+    """
+    Get the name of the partition of :table: for the :month: (a date or datetime).
+    """
+    return f"{table}_{month.year:04d}_{month.month:02d}"
+
+def create_partition(table, month):
+    """
+    Generate a statement creating the partition of :table: holding the records of :month:
+    (a date or datetime), if it doesn't already exist.
+
+    Indexes and constraints of :table: apply to the new partition automatically.
+    """
+    start = date(month.year, month.month, 1)
+    end = date(start.year + 1, 1, 1) if start.month == 12 else date(start.year, start.month + 1, 1)
+
+    return f"""
+    CREATE TABLE IF NOT EXISTS "{partition_name(table, start)}"
+    PARTITION OF "{table}"
+    FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}');
+    """
+
+def select_partitioned(table):
+    """
+    Generate a SELECT statement checking if :table: is a partitioned table, true or false.
+    """
+    return f"""
+    SELECT EXISTS (
+        SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('"{table}"')
+    );
+    """
+
+def select_records(record_type, table=None, columns=None, start_time=None, end_time=None,
+                   providers=None, postgis=False):
+    """
+    Generate a SELECT statement for the :record_type: records in :table: (the default is the :record_type:).
+
+    :columns: is an optional list of columns to select. The default is all columns.
+
+    :start_time: and :end_time: add bind parameters of the same names limiting the record's
+    primary time column (`event_time` or `start_time`).
+
+    :providers: adds a `providers` bind parameter, a list of `provider_id` to select.
+
+    Enums and UUIDs are selected as text, `event_location` as `event_lon` and `event_lat` coordinates,
+    `route` as JSON text or WKB when :postgis: is True, and times as UTC timestamps.
+    """
+    table = table or record_type
+
+    if record_type == mds.STATUS_CHANGES:
+        time_col = "event_time"
+        all_columns = [
+            "provider_id", "provider_name", "device_id", "vehicle_id", "vehicle_type", "propulsion_type",
+            "event_type", "event_type_reason", "event_time", "event_location", "battery_pct", "associated_trips"
+        ]
+    else:
+        time_col = "start_time"
+        all_columns = [
+            "provider_id", "provider_name", "device_id", "vehicle_id", "vehicle_type", "propulsion_type",
+            "trip_id", "trip_duration", "trip_distance", "route", "accuracy", "start_time", "end_time",
+            "parking_verification_url", "standard_cost", "actual_cost"
+        ]
+
+    def __select(col):
+        """
+        The select expression(s) for :col:.
+        """
+        if col == "event_location" and postgis:
+            return "ST_X(event_location) AS event_lon, ST_Y(event_location) AS event_lat"
+        if col == "event_location":
+            return ", ".join(f"(event_location->'geometry'->'coordinates'->>{i})::FLOAT AS event_{c}"
+                             for i, c in enumerate(["lon", "lat"]))
+        if col == "route":
+            return "ST_AsBinary(route) AS route" if postgis else "route::TEXT AS route"
+        if col in ["provider_id", "device_id", "trip_id", "vehicle_type", "event_type", "event_type_reason"]:
+            return f"{col}::TEXT AS {col}"
+        if col in ["propulsion_type", "associated_trips"]:
+            return f"{col}::TEXT[] AS {col}"
+        return col
+
+    selects = ",\n        ".join(__select(c) for c in (columns or all_columns))
+
+    conditions = []
+    if start_time is not None:
+        conditions.append(f"{time_col} >= :start_time")
+    if end_time is not None:
+        conditions.append(f"{time_col} < :end_time")
+    if providers is not None:
+        conditions.append("provider_id::TEXT = ANY(:providers)")
+    where = f"WHERE {' AND '.join(conditions)}" if len(conditions) > 0 else ""
+
+    return f"""
+    SELECT
+        {selects}
+    FROM "{table}"
+    {where};
+    """
+
+def create_rollup_tables(status_changes_table=mds.STATUS_CHANGES, trips_table=mds.TRIPS):
+    """
+    Generate the statements creating the hourly rollup tables maintained by `rollup_status_changes()`
+    and `rollup_trips()`:
+        - `{status_changes_table}_hourly`: status_changes per provider, hour, event_type and event_type_reason
+          (as text, with '' for no reason)
+        - `{status_changes_table}_device_hours`: the devices with a status_change per provider and hour
+        - `{trips_table}_hourly`: trips, distance and duration per provider and start hour
+    """
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS "{status_changes_table}_hourly" (
+            provider_id UUID NOT NULL,
+            provider_name TEXT NOT NULL,
+            hour TIMESTAMP NOT NULL,
+            event_type event_types NOT NULL,
+            event_type_reason TEXT NOT NULL,
+            events BIGINT NOT NULL,
+            PRIMARY KEY (provider_id, hour, event_type, event_type_reason)
+        );
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS "{status_changes_table}_device_hours" (
+            provider_id UUID NOT NULL,
+            hour TIMESTAMP NOT NULL,
+            device_id UUID NOT NULL,
+            PRIMARY KEY (provider_id, hour, device_id)
+        );
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS "{trips_table}_hourly" (
+            provider_id UUID NOT NULL,
+            provider_name TEXT NOT NULL,
+            hour TIMESTAMP NOT NULL,
+            trips BIGINT NOT NULL,
+            trip_distance BIGINT NOT NULL,
+            trip_duration BIGINT NOT NULL,
+            PRIMARY KEY (provider_id, hour)
+        );
+        """
+    ]
+
+def rollup_status_changes(source_table, dest_table=mds.STATUS_CHANGES, postgis=False):
+    """
+    Generate a statement that inserts from :source_table: like `insert_status_changes_from()`, and
+    adds only the rows actually inserted to the rollup tables of `create_rollup_tables()`.
+
+    Rows are grouped by the rollup keys only, so a provider_id seen with more than one provider_name
+    still updates each rollup row once.
+    """
+    insert = insert_status_changes_from(source_table, dest_table, postgis=postgis,
+        returning=["provider_id", "provider_name", "device_id", "event_type", "event_type_reason", "event_time"])
+
+    return f"""
+    WITH inserted AS (
+        {insert.strip().rstrip(";")}
+    ),
+    hourly AS (
+        INSERT INTO "{dest_table}_hourly" AS r
+        SELECT provider_id, max(provider_name), date_trunc('hour', event_time), event_type,
+            coalesce(event_type_reason::TEXT, ''), count(*)
+        FROM inserted
+        GROUP BY 1, 3, 4, 5
+        ORDER BY 1, 3, 4, 5
+        ON CONFLICT (provider_id, hour, event_type, event_type_reason)
+        DO UPDATE SET events = r.events + EXCLUDED.events
+    )
+    INSERT INTO "{dest_table}_device_hours"
+    SELECT DISTINCT provider_id, date_trunc('hour', event_time), device_id
+    FROM inserted
+    ORDER BY 1, 2, 3
     ON CONFLICT DO NOTHING;
     """
 
+def rollup_trips(source_table, dest_table=mds.TRIPS, postgis=False):
+    """
+    Generate a statement that inserts from :source_table: like `insert_trips_from()`, and
+    adds only the rows actually inserted to the rollup table of `create_rollup_tables()`.
+    """
+    insert = insert_trips_from(source_table, dest_table, postgis=postgis,
+        returning=["provider_id", "provider_name", "start_time", "trip_distance", "trip_duration"])
+
+    return f"""
+    WITH inserted AS (
+        {insert.strip().rstrip(";")}
+    )
+    INSERT INTO "{dest_table}_hourly" AS r
+    SELECT provider_id, max(provider_name), date_trunc('hour', start_time), count(*), sum(trip_distance), sum(trip_duration)
+    FROM inserted
+    GROUP BY 1, 3
+    ORDER BY 1, 3
+    ON CONFLICT (provider_id, hour)
+    DO UPDATE SET
+        trips = r.trips + EXCLUDED.trips,
+        trip_distance = r.trip_distance + EXCLUDED.trip_distance,
+        trip_duration = r.trip_duration + EXCLUDED.trip_duration;
+    """
+
+def create_ledger_table(table="load_ledger"):
+    """
+    Generate a statement creating the ledger :table: of sources already loaded, see `mds.db.ledger`.
+    """
+    return f"""
+    CREATE TABLE IF NOT EXISTS "{table}" (
+        record_type TEXT NOT NULL,
+        source TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        records INTEGER NOT NULL,
+        loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (record_type, source, digest)
+    );
+    """
+
+def select_ledger(table="load_ledger"):
+    """
+    Generate a SELECT statement for the sources of the ledger :table:, with a bind parameter
+    :record_type: limiting them to a single record type.
+    """
+    return f"""
+    SELECT source, digest
+    FROM "{table}"
+    WHERE record_type = :record_type;
+    """
+
+def insert_ledger(table="load_ledger"):
+    """
+    Generate an INSERT statement for the ledger :table:, with bind parameters :record_type:,
+    :source:, :digest: and :records:.
+    """
+    return f"""
+    INSERT INTO "{table}" (record_type, source, digest, records)
+    VALUES (:record_type, :source, :digest, :records)
+    ON CONFLICT DO NOTHING;
+    """
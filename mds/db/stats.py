@@ -0,0 +1,94 @@
+"""
+Time and count the stages of loading MDS Provider data.
+"""
+
+from contextlib import contextmanager
+import threading
+import time
+
+
+STAGES = ["parse", "frame", "dedup", "before_load", "stage", "upsert"]
+
+
+class LoadStats():
+    """
+    Timers and counters for each stage of a load:
+        - `parse`: reading and parsing JSON sources
+        - `frame`: building DataFrames from records
+        - `dedup`: filtering records already loaded
+        - `before_load`: transforming DataFrames before staging
+        - `stage`: staging DataFrames in the temp table (or appending them without staging)
+        - `upsert`: inserting from the temp table into the destination
+    """
+
+    def __init__(self, record_type, table=None, hook=None):
+        """
+        Initialize a new `LoadStats` for a load of :record_type: into :table:.
+
+        :hook: is an optional callable, called with a dict describing each timed stage:
+        `record_type`, `table`, `stage`, `seconds` and the counters of the stage, e.g. `rows`.
+        """
+        self.record_type = record_type
+        self.table = table
+        self.hook = hook
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def add(self, stage, seconds=0.0, **counters):
+        """
+        Add the :seconds: and :counters: (e.g. `rows=100`) of a run of the :stage:.
+        """
+        with self.lock:
+            totals = self.stages.setdefault(stage, dict(calls=0, seconds=0.0))
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            for name, value in counters.items():
+                if value is not None:
+                    totals[name] = totals.get(name, 0) + value
+
+        if self.hook is not None:
+            self.hook(dict(record_type=self.record_type, table=self.table, stage=stage, seconds=seconds, **counters))
+
+    @contextmanager
+    def time(self, stage, **counters):
+        """
+        Time the body of the `with` statement as a run of :stage:.
+
+        Yields a dict of the :counters:, to update with counts known only after the work is done.
+        """
+        counters = dict(counters)
+        start = time.perf_counter()
+        yield counters
+        self.add(stage, time.perf_counter() - start, **counters)
+
+    def finish(self):
+        """
+        Stop the clock on the load.
+        """
+        self.seconds = time.perf_counter() - self.start
+
+    def summary(self):
+        """
+        :returns: A dict of stage => dict of totals (`calls`, `seconds` and counters), in stage order.
+        """
+        with self.lock:
+            order = STAGES + sorted(s for s in self.stages if s not in STAGES)
+            return {s: dict(self.stages[s]) for s in order if s in self.stages}
+
+    def report(self):
+        """
+        :returns: A printable summary of the load, one line per stage.
+        """
+        seconds = self.seconds if self.seconds is not None else time.perf_counter() - self.start
+        lines = [f"Loaded {self.record_type} into {self.table} in {seconds:.2f}s"]
+
+        for stage, totals in self.summary().items():
+            rows = totals.get("rows")
+            rate = f" ({rows / totals['seconds']:,.0f} rows/s)" if rows and totals["seconds"] > 0 else ""
+            counts = ", ".join(f"{k}={v:,}" for k, v in totals.items() if k not in ("calls", "seconds"))
+            share = 100 * totals["seconds"] / seconds if seconds > 0 else 0
+            lines.append(f"  {stage:<12} {totals['seconds']:8.2f}s {share:5.1f}%  {counts}{rate}")
+
+        return "\n".join(lines)
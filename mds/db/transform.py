@@ -0,0 +1,213 @@
+"""
+Prepare DataFrames of MDS Provider data for staging.
+"""
+
+import csv
+import json
+from mds.geometry import RouteArray, extract_coords, points_to_wkb
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+STATUS_CHANGES_COLS = [
+    "provider_id",
+    "provider_name",
+    "device_id",
+    "vehicle_id",
+    "vehicle_type",
+    "propulsion_type",
+    "event_type",
+    "event_type_reason",
+    "event_time",
+    "event_location",
+    "battery_pct",
+    "associated_trips"
+]
+
+TRIPS_COLS = [
+    "provider_id",
+    "provider_name",
+    "device_id",
+    "vehicle_id",
+    "vehicle_type",
+    "propulsion_type",
+    "trip_id",
+    "trip_duration",
+    "trip_distance",
+    "route",
+    "accuracy",
+    "start_time",
+    "end_time",
+    "parking_verification_url",
+    "standard_cost",
+    "actual_cost"
+]
+
+
+def json_strings(values):
+    """
+    Serialize each of :values: to a compact JSON string, with None for missing values.
+
+    Uses `orjson` when it's installed, which is several times faster than the standard library
+    and produces equivalent JSON.
+
+    :returns: An object NumPy array.
+    """
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+        def encode(v):
+            return orjson.dumps(v, default=str, option=options).decode()
+    else:
+        encode = json.JSONEncoder(separators=(",", ":"), default=str).encode
+
+    return np.array([None if v is None or v != v else encode(v) for v in values], dtype=object)
+
+def point_hex_wkb(values, srid=4326):
+    """
+    Encode each of the GeoJSON Point Feature :values: as hex EWKB, with None for missing values.
+
+    :returns: An object NumPy array.
+    """
+    lon, lat = extract_coords(values)
+    return np.array([None if w is None else w.hex() for w in points_to_wkb(lon, lat, srid=srid)], dtype=object)
+
+def route_hex_wkb(values, srid=4326):
+    """
+    Encode each of the GeoJSON FeatureCollection :values: as a hex EWKB LineString.
+
+    :returns: An object NumPy array.
+    """
+    routes = RouteArray.from_geojson(values)
+    return np.array([w.hex() for w in routes.to_wkb(srid=srid)], dtype=object)
+
+def lists(values):
+    """
+    Replace each of :values: that isn't a list with an empty list.
+
+    :returns: An object NumPy array.
+    """
+    result = np.empty(len(values), dtype=object)
+    result[:] = [v if isinstance(v, list) else [] for v in values]
+    return result
+
+def array_literals(values, brackets="{}"):
+    """
+    Format each list or tuple in :values: as a quoted PostgreSQL array literal, e.g. `{"a","b"}`.
+    Other values are kept as they are.
+
+    :brackets: are the opening and closing characters, e.g. `[]` for DuckDB list literals.
+
+    :returns: An object NumPy array.
+    """
+    def __literal(value):
+        """
+        Format a single list :value:.
+        """
+        items = ('"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for v in value)
+        return brackets[0] + ",".join(items) + brackets[1]
+
+    return np.array([__literal(v) if isinstance(v, (list, tuple)) else v for v in values], dtype=object)
+
+
+class RecordTransform():
+    """
+    A fixed set of column conversions that prepares a DataFrame of records for staging.
+    """
+
+    def __init__(self, columns, json_cols=None, list_cols=None, point_cols=None, route_cols=None):
+        """
+        Initialize a new `RecordTransform`.
+
+        :columns: is the ordered list of columns the staging table expects. Missing columns are
+        added empty, other columns are kept after these.
+
+        :json_cols: is the list of columns to serialize to JSON strings.
+
+        :list_cols: is the list of array columns whose missing values become empty lists.
+
+        :point_cols: and :route_cols: are the lists of GeoJSON Point and FeatureCollection
+        columns to encode as hex EWKB (SRID 4326), for PostGIS geometry columns.
+        """
+        self.columns = list(columns)
+        self.json_cols = list(json_cols or [])
+        self.list_cols = list(list_cols or [])
+        self.point_cols = list(point_cols or [])
+        self.route_cols = list(route_cols or [])
+
+    def __call__(self, df):
+        """
+        Apply this transform to the DataFrame :df:.
+
+        :returns: A new DataFrame with the columns in a deterministic order.
+        """
+        extra = [c for c in df.columns if c not in self.columns]
+        df = df.reindex(columns=self.columns + extra)
+
+        for col in self.json_cols:
+            df[col] = json_strings(df[col].values)
+
+        for col in self.list_cols:
+            df[col] = lists(df[col].values)
+
+        for col in self.point_cols:
+            df[col] = point_hex_wkb(df[col].values)
+
+        for col in self.route_cols:
+            df[col] = route_hex_wkb(df[col].values)
+
+        return df
+
+    @classmethod
+    def StatusChanges(cls, postgis=False):
+        """
+        The transform for status_changes.
+
+        :postgis: when True, encodes `event_location` as EWKB instead of JSON.
+        """
+        if postgis:
+            return cls(STATUS_CHANGES_COLS, point_cols=["event_location"], list_cols=["associated_trips"])
+        return cls(STATUS_CHANGES_COLS, json_cols=["event_location"], list_cols=["associated_trips"])
+
+    @classmethod
+    def Trips(cls, postgis=False):
+        """
+        The transform for trips.
+
+        :postgis: when True, encodes `route` as EWKB instead of JSON.
+        """
+        if postgis:
+            return cls(TRIPS_COLS, route_cols=["route"])
+        return cls(TRIPS_COLS, json_cols=["route"])
+
+
+def copy_strings(df, brackets="{}"):
+    """
+    Convert the list values of :df: to PostgreSQL array literals for `COPY ... FROM STDIN WITH (FORMAT csv)`.
+
+    :brackets: are the array literal's opening and closing characters, see `array_literals()`.
+
+    :returns: A new DataFrame.
+    """
+    df = df.copy()
+
+    for col in df.columns:
+        values = df[col].values
+        if values.dtype == object and any(isinstance(v, (list, tuple)) for v in values):
+            df[col] = array_literals(values, brackets=brackets)
+
+    return df
+
+def copy_csv(df, null="\\N"):
+    """
+    Write :df: as CSV text for `COPY ... FROM STDIN`, see `mds.db.sql.copy_from()`.
+
+    Missing values are written as the :null: string rather than left empty, so that COPY
+    reads empty strings as empty strings, as an INSERT would, and not as NULL.
+    """
+    return copy_strings(df).to_csv(index=False, header=False, quoting=csv.QUOTE_MINIMAL, na_rep=null)
+
@@ -2,6 +2,7 @@
 Generate fake MDS Provider data.
 """
 
-from mds.fake import data, geometry, provider
+from mds.fake import data, fleet, geometry, provider, shards
+from mds.fake.fleet import FleetSimulator
 from mds.fake.provider import ProviderDataGenerator
 
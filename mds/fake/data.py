@@ -11,28 +11,37 @@ import uuid
 
 def random_date_from(date,
                      min_td=timedelta(seconds=0),
-                     max_td=timedelta(seconds=0)):
+                     max_td=timedelta(seconds=0),
+                     rng=random):
     """
     Produces a datetime at a random offset from :date:.
+
+    :rng: is an optional `random.Random` to draw from, the `random` module by default.
     """
     min_s = min(min_td.total_seconds(), max_td.total_seconds())
     max_s = max(min_td.total_seconds(), max_td.total_seconds())
-    offset = random.uniform(min_s, max_s)
+    offset = rng.uniform(min_s, max_s)
     return date + timedelta(seconds=offset)
 
-def random_string(k, chars=None):
+def random_string(k, chars=None, rng=random):
     """
     Create a random string of length :k: from the set of uppercase letters
     and numbers.
 
-    Optionally use the set of characters :chars:.
+    Optionally use the set of characters :chars:, and draw from the `random.Random` :rng:.
     """
     if chars is None:
         chars = string.ascii_uppercase + string.digits 
-    return "".join(random.choices(chars, k=k))
+    return "".join(rng.choices(chars, k=k))
 
-def random_file_url(company):
+def random_file_url(company, rng=random):
     return "https://{}.co/{}.jpg".format(
-        "-".join(company.split()), random_string(7)
+        "-".join(company.split()), random_string(7, rng=rng)
     ).lower()
 
+def random_uuid(rng=random):
+    """
+    Create a random (version 4) UUID from the `random.Random` :rng:, so that seeding it makes the UUID reproducible.
+    """
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
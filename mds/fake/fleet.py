@@ -0,0 +1,280 @@
+"""
+Simulating a fleet of devices with NumPy arrays.
+"""
+
+from contextlib import contextmanager
+from datetime import timedelta
+import gc
+from mds.fake.geometry import points_nearby, points_within
+import numpy as np
+import random
+import string
+import uuid
+
+
+BATTERY = "battery_pct"
+PROPULSION = "propulsion_type"
+
+# the (event_type, event_type_reason) of each event code
+EVENTS = [
+    ("available", "service_start"),
+    ("removed", "service_end"),
+    ("reserved", "user_pick_up"),
+    ("available", "user_drop_off"),
+    ("unavailable", "low_battery"),
+    ("available", "maintenance_drop_off")
+]
+
+SERVICE_START, SERVICE_END, TRIP_START, TRIP_END, LOW_BATTERY, RECHARGED = range(len(EVENTS))
+
+URL_CHARS = np.array(list(string.ascii_lowercase + string.digits))
+
+
+def _feature(lon, lat, timestamp):
+    """
+    Helper creates a GeoJSON Point Feature with a timestamp.
+    """
+    return dict(type="Feature",
+                properties=dict(timestamp=timestamp),
+                geometry=dict(type="Point", coordinates=[lon, lat]))
+
+
+@contextmanager
+def _paused_gc():
+    """
+    Helper pauses garbage collection while building records, which can't form reference cycles;
+    otherwise collections triggered by the many new dicts take most of the time.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class FleetSimulator():
+    """
+    Simulates a service day for a whole fleet of devices at once, with the same model as
+    `ProviderDataGenerator.service_day()`.
+
+    The fleet's state (location, time, battery, active or removed) is kept in NumPy arrays,
+    trip durations, accuracies and battery drain are drawn for all devices in each hour at
+    once, and the events and trips are only turned into MDS records at the end.
+    """
+
+    def __init__(self, boundary, speed, rng=None):
+        """
+        Initialize a new `FleetSimulator`.
+
+        :boundary: is the geographic boundary within which to generate data.
+
+        :speed: is the average speed of devices (in meters/second).
+
+        :rng: is an optional `numpy.random.Generator`, by default seeded from the `random` module.
+        """
+        self.boundary = boundary
+        self.speed = speed
+        self.rng = rng if rng is not None else np.random.default_rng(random.getrandbits(64))
+
+    def _has_battery(self, device):
+        """
+        Determine if the :device: has a battery.
+        """
+        return BATTERY in device or any("electric" in pt for pt in device.get(PROPULSION, []))
+
+    def simulate(self, devices, hour_open, hour_closed, inactivity):
+        """
+        Simulate a service day between the hours of :hour_open: and :hour_closed: for the given :devices:.
+
+        :inactivity: the percent of devices to mark as inactive for the day, and the chance
+                     an active device doesn't take a trip in a given hour.
+
+        Times are in seconds from the opening hour.
+
+        Returns a tuple of dicts of arrays:
+            - events: `code`, `device`, `time`, `lon`, `lat` and `battery` (NaN without a battery)
+            - trips: `device`, `start_time`, `end_time`, `start_lon`, `start_lat`, `end_lon`, `end_lat`,
+              `duration`, `distance` and `accuracy`
+        """
+        rng, N = self.rng, len(devices)
+        close = (hour_closed - hour_open) * 3600.0
+
+        has_battery = np.array([self._has_battery(d) for d in devices], dtype=bool)
+        battery = np.where(has_battery, 1.0, np.nan)
+        lon, lat, t = np.zeros(N), np.zeros(N), np.zeros(N)
+        active, removed, removed_time = np.ones(N, dtype=bool), np.zeros(N, dtype=bool), np.zeros(N)
+
+        events, trips = [], []
+
+        def __emit(code, idx, times):
+            """
+            Record an event of :code: for the devices :idx: at :times:, at their current location and battery.
+            """
+            events.append((np.full(len(idx), code), idx, times, lon[idx], lat[idx], battery[idx]))
+
+        # inactive devices only get start/end service events in the same location
+        inactive = rng.choice(N, int(N * inactivity), replace=False)
+        active[inactive] = False
+        lon[inactive], lat[inactive] = points_within(self.boundary, len(inactive), rng=rng)
+        __emit(SERVICE_START, inactive, -rng.uniform(0, 7200, len(inactive)))
+        __emit(SERVICE_END, inactive, close + rng.uniform(0, 7200, len(inactive)))
+
+        # device placement starts in the 2 hours before opening, with a full battery
+        idx = np.flatnonzero(active)
+        lon[idx], lat[idx] = points_within(self.boundary, len(idx), rng=rng)
+        battery[idx] = np.where(has_battery[idx], 1.0, np.nan)
+        __emit(SERVICE_START, idx, -rng.uniform(0, 7200, len(idx)))
+
+        # model each hour of the day (including the last)
+        for hour in range(hour_closed - hour_open + 1):
+            # some removed devices may be recharged and put back into service this hour
+            idx = np.flatnonzero(removed)
+            recharged = rng.choice(idx, rng.integers(0, len(idx) + 1), replace=False)
+            if len(recharged) > 0:
+                t[recharged] = removed_time[recharged]
+                lon[recharged], lat[recharged] = points_within(self.boundary, len(recharged), rng=rng)
+                battery[recharged] = np.where(has_battery[recharged], 1.0, np.nan)
+                removed[recharged], active[recharged] = False, True
+                __emit(RECHARGED, recharged, t[recharged])
+
+            # devices with a low battery are removed
+            idx = np.flatnonzero(active)
+            low = idx[has_battery[idx] & (battery[idx] < 0.2)]
+            __emit(LOW_BATTERY, low, t[low])
+            active[low], removed[low], removed_time[low] = False, True, t[low]
+
+            # the rest take a trip this hour, or leak some power
+            idx = np.flatnonzero(active)
+            takes = rng.random(len(idx)) < 1 - inactivity
+            idle, idx = idx[~takes & has_battery[idx]], idx[takes]
+            battery[idle] *= 1 - rng.uniform(0, 0.05, len(idle))
+
+            start = t[idx] + rng.uniform(0, 3600, len(idx))
+            __emit(TRIP_START, idx, start)
+
+            # gamma distributed trip durations (see ProviderDataGenerator.device_trip), in seconds
+            duration = rng.gamma(3, 4.5, len(idx)) * 60
+            distance = duration * self.speed * 0.8
+            accuracy = rng.rayleigh(5, len(idx))
+
+            # drain the battery according to the speed and distance traveled
+            rate = np.sqrt(distance) / 200
+            battery[idx] = (battery[idx] - self.speed / 100) * (1 - rate)
+
+            end_lon, end_lat = points_nearby(lon[idx], lat[idx], distance, rng=rng)
+            trips.append((idx, start, start + duration, lon[idx], lat[idx], end_lon, end_lat, duration, distance, accuracy))
+
+            lon[idx], lat[idx], t[idx] = end_lon, end_lat, start + duration
+            __emit(TRIP_END, idx, t[idx])
+
+        # end service for the remaining active devices, in the 2 hours after closing
+        idx = np.flatnonzero(active)
+        __emit(SERVICE_END, idx, close + rng.uniform(0, 7200, len(idx)))
+
+        event_cols = {"code": int, "device": int, "time": float, "lon": float, "lat": float, "battery": float}
+        trip_cols = {"device": int, "start_time": float, "end_time": float, "start_lon": float, "start_lat": float,
+                     "end_lon": float, "end_lat": float, "duration": float, "distance": float, "accuracy": float}
+
+        def __columns(rows, cols):
+            """
+            Combine the tuples of arrays :rows: into a dict of :cols: => array, typed even when there are no rows.
+            """
+            return {c: np.concatenate([r[i] for r in rows]).astype(dtype) if rows else np.empty(0, dtype=dtype)
+                    for i, (c, dtype) in enumerate(cols.items())}
+
+        return __columns(events, event_cols), __columns(trips, trip_cols)
+
+    def status_changes(self, devices, events, start_time):
+        """
+        Create the status change records for the simulated :events: of :devices:,
+        with times relative to the datetime :start_time:.
+        """
+        bases = [{k: v for k, v in d.items() if k != BATTERY} for d in devices]
+        associated = self.rng.integers(0, 4, len(events["code"]))
+        records = []
+
+        with _paused_gc():
+            for code, i, t, lon, lat, battery, a in zip(events["code"].tolist(), events["device"].tolist(),
+                                                       events["time"].tolist(), events["lon"].tolist(),
+                                                       events["lat"].tolist(), events["battery"].tolist(),
+                                                       associated.tolist()):
+                event_type, event_type_reason = EVENTS[code]
+                event_time = start_time + timedelta(seconds=t)
+                record = dict(bases[i],
+                              event_type=event_type,
+                              event_type_reason=event_type_reason,
+                              event_time=event_time,
+                              event_location=_feature(lon, lat, event_time))
+
+                if battery == battery:
+                    record[BATTERY] = battery
+
+                # maybe add an empty associated_trips array
+                if code == SERVICE_START and a > 1:
+                    record["associated_trips"] = None if a == 2 else []
+
+                records.append(record)
+
+        return records
+
+    def trips(self, devices, trips, start_time):
+        """
+        Create the trip records for the simulated :trips: of :devices:,
+        with times relative to the datetime :start_time:.
+        """
+        rng, N = self.rng, len(trips["device"])
+        bases = [{k: v for k, v in d.items() if k != BATTERY} for d in devices]
+
+        # optional parking_verification_url, standard_cost and actual_cost
+        optional = (rng.random((3, N)) < 0.5).tolist()
+        minutes = np.floor(trips["duration"] / 60) - 1
+        standard_cost = (100 + minutes * 15).astype(int).tolist()
+        actual_cost = (rng.integers(75, 151, N) + minutes * rng.integers(12, 21, N)).astype(int).tolist()
+        urls = ["".join(chars) for chars in rng.choice(URL_CHARS, (N, 7)).tolist()]
+        trip_ids = rng.bytes(16 * N)
+
+        cols = {k: v.tolist() for k, v in trips.items()}
+        records = []
+
+        with _paused_gc():
+            for j, i in enumerate(cols["device"]):
+                start = start_time + timedelta(seconds=cols["start_time"][j])
+                end = start_time + timedelta(seconds=cols["end_time"][j])
+                features = [_feature(cols["start_lon"][j], cols["start_lat"][j], start),
+                            _feature(cols["end_lon"][j], cols["end_lat"][j], end)]
+
+                trip = dict(bases[i],
+                            accuracy=int(cols["accuracy"][j]),
+                            trip_id=uuid.UUID(bytes=trip_ids[16 * j:16 * (j + 1)], version=4),
+                            trip_duration=int(cols["duration"][j]),
+                            trip_distance=int(cols["distance"][j]),
+                            route=dict(type="FeatureCollection", features=features),
+                            start_time=start,
+                            end_time=end)
+
+                if optional[0][j]:
+                    company = "-".join(str(bases[i].get("provider_name", "")).split()).lower()
+                    trip.update(parking_verification_url=f"https://{company}.co/{urls[j]}.jpg")
+                if optional[1][j]:
+                    trip.update(standard_cost=standard_cost[j])
+                if optional[2][j]:
+                    trip.update(actual_cost=actual_cost[j])
+
+                records.append(trip)
+
+        return records
+
+    def service_day(self, devices, date, hour_open, hour_closed, inactivity):
+        """
+        Create status change events and trips on :date: between the hours of
+        :hour_open: and :hour_closed: for the given :devices:, see `simulate()`.
+
+        Returns a tuple:
+            - status_changes = list of status_change objects for the day
+            - trips = list of trip objects for the day
+        """
+        start_time = date.replace(hour=hour_open)
+        events, trips = self.simulate(devices, hour_open, hour_closed, inactivity)
+        return self.status_changes(devices, events, start_time), self.trips(devices, trips, start_time)
@@ -2,23 +2,31 @@
 Generating random geometry.
 """
 
+import functools
 import math
+import numpy as np
 import random
+import shapely
 from shapely.geometry import Point
 import shapely.ops
 
 
-def point_within(boundary):
+EARTH_RADIUS = 6378100
+
+
+def point_within(boundary, rng=random):
     """
     Create a random point somewhere within the Polygon :boundary:
+
+    :rng: is an optional `random.Random` to draw from, the `random` module by default.
     """
     # expand the bounds into the "4 corners"
     min_x, min_y, max_x, max_y = boundary.bounds
 
     # helper computes a new random point
     def compute():
-        return Point(random.uniform(min_x, max_x),
-                     random.uniform(min_y, max_y))
+        return Point(rng.uniform(min_x, max_x),
+                     rng.uniform(min_y, max_y))
 
     # loop until we get an interior point
     point = compute()
@@ -27,19 +35,19 @@ def point_within(boundary):
 
     return point
 
-def point_nearby(point, dist, bearing=None):
+def point_nearby(point, dist, bearing=None, rng=random):
     """
     Create a random point :dist: meters from :point:
 
     Uses the Haversine formula to compute a new lat/lon given a distance and
-    bearing. Uses the provided bearing, or random if None.
+    bearing. Uses the provided bearing, or random from :rng: if None.
 
     See: http://www.movable-type.co.uk/scripts/latlong.html#destPoint
     """
     lat1 = math.radians(point.y)
     lon1 = math.radians(point.x)
-    ang_dist = dist / 6378100 # radius of Earth in meters
-    bearing = random.uniform(0, 2*math.pi) if bearing is None else bearing
+    ang_dist = dist / EARTH_RADIUS
+    bearing = rng.uniform(0, 2*math.pi) if bearing is None else bearing
 
     # calc the new latitude
     lat2 = math.asin(math.sin(lat1) * math.cos(ang_dist) + 
@@ -52,3 +60,155 @@ def point_nearby(point, dist, bearing=None):
     # return the new point
     return Point(math.degrees(lon2), math.degrees(lat2))
 
+
+def _rng(rng):
+    """
+    Helper returns the numpy Generator :rng:, or a new one seeded from the `random.Random` :rng:
+    (the `random` module if None), so that seeding it also makes the batch samplers reproducible.
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng((random if rng is None else rng).getrandbits(64))
+
+@functools.lru_cache(maxsize=16)
+def _triangles(boundary):
+    """
+    Helper triangulates the Polygon :boundary:, returning the (N, 3, 2) array of triangle vertices.
+
+    Without the constrained triangulation (Shapely < 2.1), the Delaunay triangles of the densified
+    boundary's vertices that lie within it are used instead. They can miss slivers along concave edges.
+    """
+    if hasattr(shapely, "constrained_delaunay_triangles"):
+        triangles = shapely.get_parts(shapely.constrained_delaunay_triangles(boundary))
+    else:
+        min_x, min_y, max_x, max_y = boundary.bounds
+        dense = shapely.segmentize(boundary, max(max_x - min_x, max_y - min_y) / 100)
+        triangles = shapely.get_parts(shapely.delaunay_triangles(dense))
+        triangles = triangles[shapely.covered_by(triangles, dense)]
+
+    return shapely.get_coordinates(triangles).reshape(-1, 4, 2)[:, :3]
+
+def _areas(triangles):
+    """
+    Helper computes the areas of the (N, 3, 2) :triangles:.
+    """
+    ab, ac = triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]
+    return np.abs(ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0]) / 2
+
+def _subdivide(triangles, max_area):
+    """
+    Helper splits each of the (N, 3, 2) :triangles: into 4 at its edge midpoints, until none is larger than :max_area:.
+    """
+    large = _areas(triangles) > max_area
+
+    while large.any():
+        t = triangles[large]
+        a, b, c = t[:, 0], t[:, 1], t[:, 2]
+        ab, bc, ca = (a + b) / 2, (b + c) / 2, (c + a) / 2
+        split = np.concatenate([np.stack(s, axis=1) for s in [(a, ab, ca), (ab, b, bc), (ca, bc, c), (ab, bc, ca)]])
+        triangles = np.concatenate([triangles[~large], split])
+        large = _areas(triangles) > max_area
+
+    return triangles
+
+def points_within(boundary, n, weights=None, rng=None, resolution=1000):
+    """
+    Create :n: random points somewhere within the Polygon :boundary:, all at once.
+
+    The boundary is triangulated, triangles are drawn in proportion to their area, and a
+    point is drawn uniformly within each drawn triangle, so no candidates are rejected.
+
+    :weights: is an optional density, a function of arrays (lon, lat) returning a non-negative
+    weight for each, e.g. to concentrate points around hotspots. The density is evaluated at
+    the centroids of triangles no larger than 1/:resolution: of the boundary's area.
+
+    :rng: is an optional `numpy.random.Generator` or `random.Random`.
+
+    :returns: A tuple of float arrays (lon, lat).
+    """
+    rng = _rng(rng)
+    triangles = _triangles(boundary)
+
+    p = _areas(triangles)
+    if weights is not None:
+        triangles = _subdivide(triangles, p.sum() / resolution)
+        centroids = triangles.mean(axis=1)
+        p = _areas(triangles) * np.asarray(weights(centroids[:, 0], centroids[:, 1]), dtype=float)
+
+    idx = rng.choice(len(triangles), n, p=p / p.sum())
+    a, b, c = triangles[idx, 0], triangles[idx, 1], triangles[idx, 2]
+
+    # uniform within each triangle, folding the far half of the parallelogram back in
+    r = rng.random((2, n))
+    fold = r.sum(axis=0) > 1
+    r[:, fold] = 1 - r[:, fold]
+    points = a + r[0][:, None] * (b - a) + r[1][:, None] * (c - a)
+
+    return points[:, 0], points[:, 1]
+
+def _into_boundary(boundary, lon, lat, mode):
+    """
+    Helper moves the points :lon:, :lat: outside the Polygon :boundary: back into it, by :mode::
+        - "clip" to the nearest point on the boundary
+        - "reflect" across the nearest point on the boundary, or clipped if the reflection is still outside
+    """
+    if mode not in ("clip", "reflect"):
+        raise ValueError(f"Unknown mode {mode}, expected 'clip' or 'reflect'.")
+
+    shapely.prepare(boundary)
+    lon, lat = np.array(lon, dtype=float), np.array(lat, dtype=float)
+    outside = ~shapely.intersects_xy(boundary, lon, lat)
+
+    if not outside.any():
+        return lon, lat
+
+    points = shapely.points(lon[outside], lat[outside])
+    coords = shapely.get_coordinates(points)
+    nearest = shapely.get_coordinates(shapely.shortest_line(points, boundary.boundary))[1::2]
+
+    # nudge clipped points just inside, away from where they were
+    outward = coords - nearest
+    length = np.hypot(outward[:, 0], outward[:, 1])[:, None]
+    nearest -= outward / np.where(length > 0, length, 1) * 1e-9
+
+    if mode == "reflect":
+        reflected = 2 * nearest - coords
+        inside = shapely.intersects_xy(boundary, reflected[:, 0], reflected[:, 1])
+        nearest[inside] = reflected[inside]
+
+    lon[outside], lat[outside] = nearest[:, 0], nearest[:, 1]
+    return lon, lat
+
+def points_nearby(lon, lat, dist, bearing=None, rng=None, boundary=None, mode="clip"):
+    """
+    Create a random point :dist: meters from each of the points :lon:, :lat:, like `point_nearby()`.
+
+    :dist: is an array (or single value) of distances in meters.
+
+    :bearing: is an optional array (or single value) of bearings in radians, random if None.
+
+    :rng: is an optional `numpy.random.Generator` or `random.Random`.
+
+    :boundary: is an optional Polygon to keep the new points within, by :mode::
+        - "clip" moves points outside the boundary to the nearest point on it
+        - "reflect" mirrors points outside the boundary back across it
+
+    :returns: A tuple of float arrays (lon, lat).
+    """
+    rng = _rng(rng)
+    lon1, lat1 = np.radians(np.asarray(lon, dtype=float)), np.radians(np.asarray(lat, dtype=float))
+    ang_dist = np.asarray(dist, dtype=float) / EARTH_RADIUS
+    bearing = rng.uniform(0, 2 * math.pi, np.shape(lon1)) if bearing is None else np.asarray(bearing, dtype=float)
+
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(ang_dist) +
+                     np.cos(lat1) * np.sin(ang_dist) * np.cos(bearing))
+
+    lon2 = lon1 + np.arctan2(np.sin(bearing) * np.sin(ang_dist) * np.cos(lat1),
+                             np.cos(ang_dist) - np.sin(lat1) * np.sin(lat2))
+
+    lon2, lat2 = np.degrees(lon2), np.degrees(lat2)
+
+    if boundary is not None:
+        return _into_boundary(boundary, lon2, lat2, mode)
+
+    return lon2, lat2
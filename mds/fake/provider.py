@@ -6,12 +6,13 @@ from datetime import datetime, timedelta
 import math
 import mds
 from mds.json import extract_point, to_feature
-from mds.fake.data import random_date_from, random_string, random_file_url
-from mds.fake.geometry import point_within, point_nearby
+from mds.fake.data import random_date_from, random_string, random_file_url, random_uuid
+from mds.fake.fleet import FleetSimulator
+from mds.fake.geometry import point_within, point_nearby, points_within
 from mds.schema import ProviderSchema
+import numpy as np
 import random
-import scipy.stats
-import uuid
+from shapely.geometry import Point
 
 
 BATTERY = "battery_pct"
@@ -39,18 +40,24 @@ class ProviderDataGenerator:
             - :speed: the average speed of devices (in meters/second)
             - :vehicle_types: the vehicle_types to use for generation
             - :propulsion_types: the propulsion_types to use for generation
+            - :rng: a `random.Random` to draw all values (including UUIDs) from, the `random` module by default;
+              seed it to make generation reproducible
         """
-        schema = ProviderSchema(mds.TRIPS)
-
         key = "boundary"
         if not key in kwargs:
             raise("A geographic boundary is required")
         self.boundary = kwargs[key]
 
+        self.random = kwargs.get("rng") or random
+
         key = "speed"
         if key in kwargs and kwargs[key] is not None:
             self.speed = kwargs[key]
 
+        # the schema is only needed for defaults
+        if kwargs.get("vehicle_types") is None or kwargs.get("propulsion_types") is None:
+            schema = ProviderSchema(mds.TRIPS)
+
         key = "vehicle_types"
         if key in kwargs and kwargs[key] is not None:
             self.vehicle_types = kwargs[key].split(",")\
@@ -70,15 +77,15 @@ class ProviderDataGenerator:
         Create a list of length :N: representing devices operated by :provider:.
         """
         devices = []
-        provider_id = uuid.uuid4()
+        provider_id = random_uuid(self.random)
 
         for _ in range(N):
             device = dict(provider_id=provider_id,
                           provider_name=provider,
-                          device_id=uuid.uuid4(),
-                          vehicle_id=random_string(6),
-                          vehicle_type=random.choice(self.vehicle_types),
-                          propulsion_type=[random.choice(self.propulsion_types)])
+                          device_id=random_uuid(self.random),
+                          vehicle_id=random_string(6, rng=self.random),
+                          vehicle_type=self.random.choice(self.vehicle_types),
+                          propulsion_type=[self.random.choice(self.propulsion_types)])
 
             # ensure electric devices are charged
             if self.has_battery(device):
@@ -88,6 +95,16 @@ class ProviderDataGenerator:
 
         return devices
 
+    def fleet(self, rng=None):
+        """
+        Create a `FleetSimulator` for this generator's boundary and speed, to simulate
+        service days for a whole fleet at once.
+
+        :rng: is an optional `numpy.random.Generator`, by default seeded from this generator's `random.Random`.
+        """
+        return FleetSimulator(self.boundary, self.speed,
+                              rng=rng if rng is not None else np.random.default_rng(self.random.getrandbits(64)))
+
     def service_day(self, devices, date, hour_open, hour_closed, inactivity):
         """
         Create status change events and trips on :date: between the hours of 
@@ -106,21 +123,22 @@ class ProviderDataGenerator:
 
         # partition the devices into inactive and active
         # inactive will only get start/end service events in the same location
-        inactive_devices = random.sample(devices, int(len(devices)*inactivity))
+        inactive_devices = self.random.sample(devices, int(len(devices)*inactivity))
+        inactive_ids = set(d["device_id"] for d in inactive_devices)
         inactive_starts = self.start_service(inactive_devices, start_time)
         inactive_locations = [e[EVENT_LOC] for e in inactive_starts]
         inactive_ends = self.end_service(inactive_devices, end_time, inactive_locations)
         day_status_changes.extend(inactive_starts + inactive_ends)
 
         # all the rest of the devices that participate in the service day
-        active_devices = [d for d in devices if d not in inactive_devices]
+        active_devices = [d for d in devices if d["device_id"] not in inactive_ids]
         start_events = self.start_service(active_devices, start_time)
         day_status_changes.extend(start_events)
 
-        # the list of event_time from the prior event for each device
-        # initialized to the beginning of the day
+        # the event_time and event_location of the prior event for each active device,
+        # kept in the same order (slot) as active_devices
+        # times are initialized to the beginning of the day
         times = [start_time for e in start_events]
-        # the list of event_location from the prior event for each device
         locations = [e[EVENT_LOC] for e in start_events]
         # devices removed from service during a given hour
         removed_devices = []
@@ -128,7 +146,7 @@ class ProviderDataGenerator:
         # model each hour of the day (including the last)
         for hour in range(hour_open, hour_closed + 1):
             # some devices may be recharged and put back into service this hour
-            recharged = random.sample(removed_devices, random.randint(0, len(removed_devices)))
+            recharged = self.random.sample(removed_devices, self.random.randint(0, len(removed_devices)))
             if len(recharged) > 0:
                 # re-activate these for the hour
                 active_devices.extend(recharged)
@@ -138,7 +156,8 @@ class ProviderDataGenerator:
                 times.extend([e[EVENT_TIME] for e in events])
                 locations.extend([e[EVENT_LOC] for e in events])
                 # update the list of removed devices
-                removed_devices = [d for d in removed_devices if d not in recharged]
+                recharged_ids = set(r["device_id"] for r in recharged)
+                removed_devices = [d for d in removed_devices if d["device_id"] not in recharged_ids]
 
             # generate data for the hour
             active_devices, times, locations, removed, hour_changes, hour_trips = \
@@ -180,23 +199,16 @@ class ProviderDataGenerator:
             - status changes for this hour
             - trips starting this hour
         """
-        active, removed, changes, trips = [], [], [], []
+        active, active_times, active_locations, removed, changes, trips = [], [], [], [], [], []
 
         # chance of taking or not taking a trip
         weights = [1 - inactivity, inactivity]
-        for device_idx in range(0, len(devices)):
-            # assume this device will be active this hour
-            device = devices[device_idx]
-            active.append(device)
-            location = locations[device_idx]
-            current_time = times[device_idx]
-
+        for device, location, current_time in zip(devices, locations, times):
             # check the device's charge level
             if self.has_battery(device) and device[BATTERY] < 0.2:
                 # battery is too low -> deactivate
                 lowbattery = self.device_lowbattery(device, current_time, location)
                 # update the state for this event and device
-                del active[active.index(device)]
                 rmvd = dict(device)
                 rmvd.update(event_time=lowbattery[EVENT_TIME])
                 removed.append(rmvd)
@@ -204,7 +216,7 @@ class ProviderDataGenerator:
                 continue
 
             # will this device take a trip?
-            if random.choices([True, False], weights=weights, k=1)[0]:
+            if self.random.choices([True, False], weights=weights, k=1)[0]:
                 # yes, it will -- sometime this hour
                 status, trip = self.device_trip(device,
                                                 event_location=location,
@@ -213,16 +225,21 @@ class ProviderDataGenerator:
                 changes.extend(status)
                 trips.append(trip)
                 # update the device's time and location from the trip's end event
-                times[device_idx] = status[-1][EVENT_TIME]
-                locations[device_idx] = status[-1][EVENT_LOC]
+                current_time = status[-1][EVENT_TIME]
+                location = status[-1][EVENT_LOC]
             elif self.has_battery(device):
                 # no, it won't take a trip -- leak some power anyway
-                self.drain_battery(device, rate=random.uniform(0, 0.05))
+                self.drain_battery(device, rate=self.random.uniform(0, 0.05))
+
+            # this device remains active
+            active.append(device)
+            active_times.append(current_time)
+            active_locations.append(location)
 
         # return all the data for this hour
         return (active,
-                [times[devices.index(a)] for a in active],
-                [locations[devices.index(a)] for a in active],
+                active_times,
+                active_locations,
                 removed,
                 changes,
                 trips)
@@ -237,10 +254,11 @@ class ProviderDataGenerator:
         # device placement starts before operation open time
         # -7200 seconds == previous 2 hours from start
         offset = timedelta(seconds=-7200)
-        for device in devices:
+        lon, lat = points_within(self.boundary, len(devices), rng=self.random)
+        for idx, device in enumerate(devices):
             # somewhere in the previous :offset:
-            event_time = random_date_from(start_time, min_td=offset)
-            point = point_within(self.boundary)
+            event_time = random_date_from(start_time, min_td=offset, rng=self.random)
+            point = Point(lon[idx], lat[idx])
             feature = to_feature(point, properties=dict(timestamp=event_time))
 
             # the service_change details
@@ -252,8 +270,8 @@ class ProviderDataGenerator:
                                          event_location=feature)
 
             # maybe add an empty associated_trips array
-            if random.choice([False, True]):
-                service_start["associated_trips"] = random.choice([None, []])
+            if self.random.choice([False, True]):
+                service_start["associated_trips"] = self.random.choice([None, []])
 
             # reset the battery for electric devices
             if self.has_battery(device):
@@ -275,16 +293,16 @@ class ProviderDataGenerator:
         # device pickup likely doesn't happen right at close time
         # +7200 seconds == next 2 hours after close
         offset = timedelta(seconds=7200)
-        for device in devices:
+        for idx, device in enumerate(devices):
             # somewhere in the next :offset:
-            event_time = random_date_from(end_time, max_td=offset)
+            event_time = random_date_from(end_time, max_td=offset, rng=self.random)
 
             # use the device's index for the locations if provided
             # otherwise generate a random event_location
             if locations is None:
-                point = point_within(self.boundary)
+                point = point_within(self.boundary, rng=self.random)
             else:
-                point = extract_point(locations[devices.index(device)])
+                point = extract_point(locations[idx])
 
             # the service_change details
             feature = to_feature(point, properties=dict(timestamp=event_time))
@@ -323,10 +341,10 @@ class ProviderDataGenerator:
             - the trip
         """
         if (event_time is None) and (reference_time is not None):
-            event_time = random_date_from(reference_time, min_td=min_td, max_td=max_td)
+            event_time = random_date_from(reference_time, min_td=min_td, max_td=max_td, rng=self.random)
 
         if event_location is None:
-            point = point_within(self.boundary)
+            point = point_within(self.boundary, rng=self.random)
             event_location = to_feature(point, properties=dict(timestamp=event_time))
 
         if speed is None:
@@ -340,13 +358,13 @@ class ProviderDataGenerator:
         # see: https://static.tti.tamu.edu/tti.tamu.edu/documents/17-1.pdf
         # experimenting with the scale factors led to these parameterizations, * 60 to get seconds
         alpha, beta = 3, 4.5
-        trip_duration = random.gammavariate(alpha, beta) * 60
+        trip_duration = self.random.gammavariate(alpha, beta) * 60
 
         # account for traffic, turns, etc.
         trip_distance = trip_duration * speed * 0.8
 
-        # Model the accuracy as a rayleigh distribution with median ~5m
-        accuracy = scipy.stats.rayleigh.rvs(scale=5)
+        # Model the accuracy as a rayleigh distribution with median ~5m (by its inverse CDF)
+        accuracy = 5 * math.sqrt(-2 * math.log(1 - self.random.random()))
 
         # drain the battery according to the speed and distance traveled
         if self.has_battery(device):
@@ -358,7 +376,7 @@ class ProviderDataGenerator:
         end_time = event_time + timedelta(seconds=trip_duration)
         if end_location is None:
             start_point = extract_point(event_location)
-            end_point = point_nearby(start_point, trip_distance)
+            end_point = point_nearby(start_point, trip_distance, rng=self.random)
             end_location = to_feature(end_point, properties=dict(timestamp=end_time))
 
         # generate the route object
@@ -367,7 +385,7 @@ class ProviderDataGenerator:
         # and finally the trip object
         trip = dict(
             accuracy=int(accuracy),
-            trip_id=uuid.uuid4(),
+            trip_id=random_uuid(self.random),
             trip_duration=int(trip_duration),
             trip_distance=int(trip_distance),
             route=route,
@@ -376,19 +394,19 @@ class ProviderDataGenerator:
         )
 
         # add a parking_verification_url?
-        if random.choice([True, False]):
-            trip.update(parking_verification_url=random_file_url(device["provider_name"]))
+        if self.random.choice([True, False]):
+            trip.update(parking_verification_url=random_file_url(device["provider_name"], rng=self.random))
 
         # add a standard_cost?
-        if random.choice([True, False]):
+        if self.random.choice([True, False]):
             # $1.00 to start and $0.15 a minute thereafter
             trip.update(standard_cost=(100 + (math.floor(trip_duration/60) - 1) * 15))
 
         # add an actual cost?
-        if random.choice([True, False]):
+        if self.random.choice([True, False]):
             # randomize an actual_cost
             # $0.75 - $1.50 to start, and $0.12 - $0.20 a minute thereafter...
-            start, rate = random.randint(75, 150), random.randint(12, 20)
+            start, rate = self.random.randint(75, 150), self.random.randint(12, 20)
             trip.update(actual_cost=(start + (math.floor(trip_duration/60) - 1) * rate))
 
         # end the trip
@@ -464,23 +482,26 @@ class ProviderDataGenerator:
         """
         service_changes = []
 
-        for device in devices:
+        if event_locations is None:
+            # random points
+            lon, lat = points_within(self.boundary, len(devices), rng=self.random)
+
+        for idx, device in enumerate(devices):
             if isinstance(event_times, datetime):
                 # how many seconds until the next hour?
                 diff = (60 - event_times.minute - 1)*60 + (60 - event_times.second)
                 # random datetime between event_times and then
-                event_time = random_date_from(event_times, max_td=timedelta(seconds=diff))
+                event_time = random_date_from(event_times, max_td=timedelta(seconds=diff), rng=self.random)
             elif len(event_times) == len(devices):
                 # corresponding datetime
-                event_time = event_times[devices.index(device)]
+                event_time = event_times[idx]
 
             if event_locations is None:
-                # random point
-                point = point_within(self.boundary)
+                point = Point(lon[idx], lat[idx])
                 event_location = to_feature(point, properties=dict(timestamp=event_time))
             elif len(event_locations) == len(devices):
                 # corresponding location
-                event_location = event_locations[devices.index(device)]
+                event_location = event_locations[idx]
             else:
                 # given location
                 event_location = event_locations
@@ -0,0 +1,118 @@
+"""
+Generating fake MDS Provider data reproducibly, in shards of a provider and day.
+
+Every shard draws from its own random streams, derived from a master seed and the shard's
+(provider, date), so a shard's data doesn't depend on which other shards are generated,
+in what order, or in which process.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import hashlib
+from mds.fake.provider import ProviderDataGenerator
+import numpy as np
+import os
+import random
+
+
+def seed_sequence(seed, provider, day=None):
+    """
+    Get the `numpy.random.SeedSequence` of the :provider: (name), and optionally the :day:,
+    derived from the master :seed:.
+    """
+    key = [int.from_bytes(hashlib.sha256(provider.encode()).digest(), "little")]
+    if day is not None:
+        key.append(day.toordinal())
+
+    return np.random.SeedSequence(seed, spawn_key=key)
+
+def shard_random(seed, provider, day=None):
+    """
+    Get independent random streams for the :provider: (name) and optional :day:, see `seed_sequence()`.
+
+    :returns: A tuple (`random.Random`, `numpy.random.Generator`).
+    """
+    py_seq, np_seq = seed_sequence(seed, provider, day).spawn(2)
+    return random.Random(int.from_bytes(py_seq.generate_state(8).tobytes(), "little")), np.random.default_rng(np_seq)
+
+def generate_shard(shard):
+    """
+    Generate a service day for a provider's fleet, where :shard: is a dict of the keyword arguments
+    of `generate()`, with a single `provider`, `devices` count and `day`.
+
+    The fleet's devices are drawn from the provider's stream, so they are the same on every day.
+
+    :returns: A tuple (provider, day, status_changes, trips).
+    """
+    seed, provider, day = shard["seed"], shard["provider"], shard["day"]
+
+    def __generator(rng):
+        """
+        Create a `ProviderDataGenerator` drawing from :rng:.
+        """
+        return ProviderDataGenerator(boundary=shard["boundary"], speed=shard["speed"], rng=rng,
+                                     vehicle_types=shard["vehicle_types"], propulsion_types=shard["propulsion_types"])
+
+    devices = __generator(shard_random(seed, provider)[0]).devices(shard["devices"], provider)
+
+    py_rng, np_rng = shard_random(seed, provider, day)
+    gen = __generator(py_rng)
+    service_day = gen.fleet(rng=np_rng).service_day if shard["fleet"] else gen.service_day
+
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    status_changes, trips = service_day(devices, start, shard["hour_open"], shard["hour_closed"], shard["inactivity"])
+
+    return provider, day, status_changes, trips
+
+def generate(boundary, providers, days, seed, speed, hour_open=7, hour_closed=22, inactivity=0.05,
+             vehicle_types=None, propulsion_types=None, fleet=False, processes=None):
+    """
+    Generate service days for each of the :providers: on each of the :days:, reproducibly from the master :seed:.
+
+    :boundary: is the geographic boundary within which to generate data.
+
+    :providers: is a dict of provider name => number of devices.
+
+    :days: is an iterable of `date`.
+
+    :speed:, :vehicle_types: and :propulsion_types: are as for `ProviderDataGenerator`, and :hour_open:,
+    :hour_closed: and :inactivity: as for `ProviderDataGenerator.service_day()`.
+
+    :fleet: uses the vectorized `FleetSimulator` when True.
+
+    :processes: is the number of worker processes to generate shards on. The default is the number of CPUs;
+    with 1, shards are generated in this process.
+
+    Yields a tuple (provider, day, status_changes, trips) per shard, ordered by provider and then day.
+    """
+    # fetch the schema defaults once, rather than in every shard
+    if vehicle_types is None or propulsion_types is None:
+        defaults = ProviderDataGenerator(boundary=boundary, speed=speed,
+                                         vehicle_types=vehicle_types, propulsion_types=propulsion_types)
+        vehicle_types, propulsion_types = defaults.vehicle_types, defaults.propulsion_types
+
+    days = [d.date() if isinstance(d, datetime) else d for d in days]
+    shards = (dict(boundary=boundary, seed=seed, speed=speed, provider=provider, devices=N, day=day,
+                   hour_open=hour_open, hour_closed=hour_closed, inactivity=inactivity, fleet=fleet,
+                   vehicle_types=vehicle_types, propulsion_types=propulsion_types)
+              for provider, N in providers.items() for day in days)
+
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1:
+        yield from map(generate_shard, shards)
+        return
+
+    # keep a bounded number of shards in flight, so finished days don't pile up in memory
+    window = processes * 2
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for shard in shards:
+            pending.append(pool.submit(generate_shard, shard))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
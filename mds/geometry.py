@@ -0,0 +1,464 @@
+"""
+Work with MDS Provider geometry as NumPy arrays.
+"""
+
+import fiona
+import json
+import numpy as np
+from pathlib import Path
+import shapely
+import shapely.geometry
+
+
+def extract_coords(features):
+    """
+    Extract the coordinates from a sequence of GeoJSON Point :features: (dicts or JSON strings).
+
+    Missing or malformed features produce NaN coordinates.
+
+    Return a tuple of float64 NumPy arrays:
+        - longitudes
+        - latitudes
+    """
+    lon = np.full(len(features), np.nan)
+    lat = np.full(len(features), np.nan)
+
+    for i, feature in enumerate(features):
+        if isinstance(feature, str):
+            feature = json.loads(feature)
+        try:
+            coords = feature["geometry"]["coordinates"]
+            lon[i], lat[i] = coords[0], coords[1]
+        except (KeyError, IndexError, TypeError):
+            continue
+
+    return lon, lat
+
+def extract_route_ends(routes):
+    """
+    Extract the start and end coordinates from a sequence of GeoJSON FeatureCollection :routes:
+    (dicts or JSON strings), using the first and last Feature of each route.
+
+    Return a tuple of float64 NumPy arrays:
+        - start longitudes
+        - start latitudes
+        - end longitudes
+        - end latitudes
+    """
+    starts, ends = [], []
+
+    for route in routes:
+        if isinstance(route, str):
+            route = json.loads(route)
+        features = route.get("features", []) if isinstance(route, dict) else []
+        starts.append(features[0] if len(features) > 0 else None)
+        ends.append(features[-1] if len(features) > 0 else None)
+
+    return (*extract_coords(starts), *extract_coords(ends))
+
+def points_to_wkb(lon, lat, srid=None):
+    """
+    Encode the points given by the :lon: and :lat: arrays as little-endian WKB Points.
+
+    :srid: optionally produces PostGIS Extended WKB with the given spatial reference id.
+
+    :returns: An object NumPy array of bytes, None where either coordinate is NaN.
+    """
+    lon, lat = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+
+    fields = [("order", "u1"), ("type", "<u4")] + ([("srid", "<u4")] if srid is not None else []) + \
+             [("x", "<f8"), ("y", "<f8")]
+    points = np.empty(len(lon), dtype=np.dtype(fields))
+    points["order"] = 1
+    points["x"], points["y"] = lon, lat
+
+    if srid is None:
+        points["type"] = 1
+    else:
+        # EWKB flag for an embedded SRID
+        points["type"] = 1 | 0x20000000
+        points["srid"] = srid
+
+    data, width = points.tobytes(), points.dtype.itemsize
+    wkbs = np.array([data[i:i + width] for i in range(0, len(data), width)] + [None], dtype=object)[:-1]
+    wkbs[np.isnan(lon) | np.isnan(lat)] = None
+
+    return wkbs
+
+def parse_zones(zones_file, id_field=None):
+    """
+    Read zone polygons from the GeoJSON :zones_file:, which could be a file path or a
+    FeatureCollection dict.
+
+    :id_field: is the Feature property holding each zone's id. If None, zones are identified
+    by their position in the file.
+
+    Return a tuple:
+        - the list of zone ids
+        - the list of shapely geometries
+    """
+    if isinstance(zones_file, dict):
+        features = zones_file["features"]
+    else:
+        path = str(zones_file) if isinstance(zones_file, Path) else zones_file
+        with fiona.open(path) as src:
+            features = [dict(geometry=f["geometry"], properties=dict(f["properties"])) for f in src]
+
+    ids, geometries = [], []
+    for i, feature in enumerate(features):
+        ids.append(i if id_field is None else feature["properties"][id_field])
+        geometries.append(shapely.geometry.shape(feature["geometry"]))
+
+    return ids, geometries
+
+
+class ZoneIndex():
+    """
+    A spatial index over a set of zone polygons, for assigning many points to zones at once.
+    """
+
+    def __init__(self, geometries, ids=None):
+        """
+        Initialize a new `ZoneIndex` from a list of shapely :geometries:.
+
+        :ids: is an optional list of zone ids corresponding to :geometries:. The default is
+        the position of each geometry.
+        """
+        self.geometries = np.asarray(geometries, dtype=object)
+        self.ids = np.asarray(ids if ids is not None else range(len(geometries)), dtype=object)
+        self.tree = shapely.STRtree(self.geometries)
+
+    def locate(self, lon, lat):
+        """
+        Find the zone containing each of the points given by the :lon: and :lat: arrays.
+
+        Points on a shared border or in overlapping zones are assigned to the first matching zone.
+
+        :returns: An int64 NumPy array of zone positions, -1 where the point is in no zone.
+        """
+        points = shapely.points(np.asarray(lon, dtype=float), np.asarray(lat, dtype=float))
+        point_idx, zone_idx = self.tree.query(points, predicate="intersects")
+
+        # keep the lowest zone position for each point
+        order = np.lexsort((zone_idx, point_idx))
+        point_idx, zone_idx = point_idx[order], zone_idx[order]
+        _, first = np.unique(point_idx, return_index=True)
+
+        located = np.full(len(points), -1, dtype=np.int64)
+        located[point_idx[first]] = zone_idx[first]
+
+        return located
+
+    def lookup(self, lon, lat, missing=None):
+        """
+        Find the id of the zone containing each of the points given by the :lon: and :lat: arrays.
+
+        :missing: is the value used for points in no zone.
+
+        :returns: An object NumPy array of zone ids.
+        """
+        located = self.locate(lon, lat)
+        ids = np.full(len(located), missing, dtype=object)
+        found = located >= 0
+        ids[found] = self.ids[located[found]]
+
+        return ids
+
+    @classmethod
+    def from_geojson(cls, zones_file, id_field=None):
+        """
+        Create a `ZoneIndex` from the GeoJSON :zones_file:.
+
+        See `parse_zones(zones_file, id_field)`.
+        """
+        ids, geometries = parse_zones(zones_file, id_field=id_field)
+        return cls(geometries, ids=ids)
+
+
+def join_status_changes(df, zones, column="zone_id"):
+    """
+    Assign each status_change in the DataFrame :df: to the zone containing its `event_location`,
+    or its `event_lon` and `event_lat` columns in a typed DataFrame (see `mds.json.typed_frame()`).
+
+    :zones: is a `ZoneIndex`.
+
+    :column: is the name of the new zone id column.
+
+    :returns: A copy of :df: with the new column added.
+    """
+    if "event_location" in df:
+        lon, lat = extract_coords(df["event_location"].values)
+    else:
+        lon, lat = df["event_lon"].values.astype(np.float64), df["event_lat"].values.astype(np.float64)
+
+    df = df.copy()
+    df[column] = zones.lookup(lon, lat)
+
+    return df
+
+def join_trips(df, zones, start_column="start_zone_id", end_column="end_zone_id"):
+    """
+    Assign each trip in the DataFrame :df: to the zones containing the start and end of its `route`.
+
+    :zones: is a `ZoneIndex`.
+
+    :start_column: and :end_column: are the names of the new zone id columns.
+
+    :returns: A copy of :df: with the new columns added.
+    """
+    start_lon, start_lat, end_lon, end_lat = extract_route_ends(df["route"].values)
+
+    # locate starts and ends in a single pass over the index
+    ids = zones.lookup(np.concatenate([start_lon, end_lon]), np.concatenate([start_lat, end_lat]))
+
+    df = df.copy()
+    df[start_column] = ids[:len(df)]
+    df[end_column] = ids[len(df):]
+
+    return df
+
+
+class RouteArray():
+    """
+    A batch of trip routes stored as flat NumPy coordinate arrays.
+
+    The points of route `i` are at positions `offsets[i]:offsets[i+1]` of the `lon`, `lat`
+    and `timestamp` arrays.
+    """
+
+    EARTH_RADIUS = 6378100 # meters
+
+    def __init__(self, lon, lat, timestamp=None, offsets=None):
+        """
+        Initialize a new `RouteArray` from flat coordinate arrays.
+
+        :lon: and :lat: are the coordinates of all points of all routes, in order.
+
+        :timestamp: is an optional array of the point timestamps. Missing timestamps are NaN.
+
+        :offsets: is an array of length (number of routes + 1) marking where each route starts.
+        If None, the points form a single route.
+        """
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.timestamp = np.full(len(self.lon), np.nan) if timestamp is None \
+            else np.asarray(timestamp, dtype=np.float64)
+        self.offsets = np.array([0, len(self.lon)], dtype=np.int64) if offsets is None \
+            else np.asarray(offsets, dtype=np.int64)
+
+        if not (len(self.lon) == len(self.lat) == len(self.timestamp) == self.offsets[-1]):
+            raise ValueError("Coordinate arrays and offsets have mismatched lengths.")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __repr__(self):
+        return f"<RouteArray routes:{len(self)} points:{len(self.lon)}>"
+
+    @property
+    def counts(self):
+        """
+        The number of points in each route.
+        """
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self):
+        """
+        The memory used by the coordinate arrays, in bytes.
+        """
+        return self.lon.nbytes + self.lat.nbytes + self.timestamp.nbytes + self.offsets.nbytes
+
+    def route_index(self):
+        """
+        The position of the route each point belongs to.
+        """
+        return np.repeat(np.arange(len(self)), self.counts)
+
+    def take(self, indices):
+        """
+        Create a new `RouteArray` from the routes at :indices:.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        counts = self.counts[indices]
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        # the position of each selected point in the flat arrays
+        starts = np.repeat(self.offsets[:-1][indices] - offsets[:-1], counts)
+        positions = starts + np.arange(offsets[-1])
+
+        return RouteArray(self.lon[positions], self.lat[positions], self.timestamp[positions], offsets)
+
+    def starts(self):
+        """
+        The first point of each route.
+
+        Return a tuple of NumPy arrays (NaN for empty routes):
+            - longitudes
+            - latitudes
+            - timestamps
+        """
+        return self._point_at(self.offsets[:-1])
+
+    def ends(self):
+        """
+        The last point of each route.
+
+        Return a tuple of NumPy arrays (NaN for empty routes):
+            - longitudes
+            - latitudes
+            - timestamps
+        """
+        return self._point_at(self.offsets[1:] - 1)
+
+    def _point_at(self, positions):
+        """
+        Helper returns the lon, lat, timestamp of each route at :positions:, NaN for empty routes.
+        """
+        empty = self.counts == 0
+        positions = np.where(empty, 0, positions)
+
+        def __at(values):
+            at = values[positions] if len(values) > 0 else np.full(len(positions), np.nan)
+            return np.where(empty, np.nan, at)
+
+        return __at(self.lon), __at(self.lat), __at(self.timestamp)
+
+    def bounds(self):
+        """
+        The bounding box of each route.
+
+        :returns: A float64 array of shape (number of routes, 4) of (min_lon, min_lat, max_lon, max_lat),
+        NaN for empty routes.
+        """
+        bounds = np.full((len(self), 4), np.nan)
+        nonempty = self.counts > 0
+
+        if nonempty.any():
+            starts = self.offsets[:-1][nonempty]
+            bounds[nonempty, 0] = np.minimum.reduceat(self.lon, starts)
+            bounds[nonempty, 1] = np.minimum.reduceat(self.lat, starts)
+            bounds[nonempty, 2] = np.maximum.reduceat(self.lon, starts)
+            bounds[nonempty, 3] = np.maximum.reduceat(self.lat, starts)
+
+        return bounds
+
+    def lengths(self):
+        """
+        The great-circle length of each route in meters, using the Haversine formula.
+        """
+        lon, lat = np.radians(self.lon), np.radians(self.lat)
+
+        dlon, dlat = np.diff(lon), np.diff(lat)
+        a = np.sin(dlat / 2)**2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2)**2
+        segments = 2 * self.EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+        # segments joining the last point of one route to the first of the next don't count
+        index = self.route_index()
+        within = index[:-1] == index[1:]
+
+        return np.bincount(index[:-1][within], weights=segments[within], minlength=len(self))
+
+    def to_geojson(self):
+        """
+        Convert to a list of GeoJSON FeatureCollection dicts, one per route.
+        """
+        lon, lat, timestamp = self.lon.tolist(), self.lat.tolist(), self.timestamp.tolist()
+        routes = []
+
+        for start, end in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist()):
+            features = []
+            for i in range(start, end):
+                ts = timestamp[i]
+                properties = {} if np.isnan(ts) else dict(timestamp=int(ts) if ts.is_integer() else ts)
+                features.append(dict(type="Feature",
+                                     properties=properties,
+                                     geometry=dict(type="Point", coordinates=[lon[i], lat[i]])))
+            routes.append(dict(type="FeatureCollection", features=features))
+
+        return routes
+
+    def to_wkb(self, srid=None):
+        """
+        Convert to a list of little-endian WKB LineStrings, one per route.
+
+        :srid: optionally produces PostGIS Extended WKB with the given spatial reference id.
+
+        Routes with fewer than 2 points are padded by repeating their point.
+        """
+        coords = np.empty((len(self.lon), 2), dtype="<f8")
+        coords[:, 0], coords[:, 1] = self.lon, self.lat
+
+        header = np.array([1], dtype="u1").tobytes()
+        if srid is None:
+            header += np.array([2], dtype="<u4").tobytes()
+        else:
+            # EWKB flag for an embedded SRID
+            header += np.array([2 | 0x20000000, srid], dtype="<u4").tobytes()
+
+        wkbs = []
+        for start, end in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist()):
+            points = coords[start:end]
+            if len(points) == 1:
+                points = np.repeat(points, 2, axis=0)
+            wkbs.append(header + np.array([len(points)], dtype="<u4").tobytes() + points.tobytes())
+
+        return wkbs
+
+    @classmethod
+    def from_geojson(cls, routes):
+        """
+        Create a `RouteArray` from a sequence of GeoJSON FeatureCollection :routes: (dicts or JSON strings).
+
+        Point timestamps are read from each Feature's `timestamp` property; datetimes are
+        converted to Unix seconds.
+        """
+        lon, lat, timestamp, counts = [], [], [], []
+
+        for route in routes:
+            if isinstance(route, str):
+                route = json.loads(route)
+            features = route.get("features", []) if isinstance(route, dict) else []
+
+            for feature in features:
+                coords = feature["geometry"]["coordinates"]
+                ts = (feature.get("properties") or {}).get("timestamp")
+                lon.append(coords[0])
+                lat.append(coords[1])
+                timestamp.append(np.nan if ts is None else ts.timestamp() if hasattr(ts, "timestamp") else ts)
+
+            counts.append(len(features))
+
+        offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+        return cls(lon, lat, timestamp, offsets)
+
+    @classmethod
+    def from_wkb(cls, wkbs):
+        """
+        Create a `RouteArray` from a sequence of WKB or EWKB LineString :wkbs: (bytes or hex strings).
+
+        WKB carries no timestamps, so all point timestamps are NaN.
+        """
+        geometries = shapely.from_wkb(np.asarray(wkbs, dtype=object))
+        coords, index = shapely.get_coordinates(geometries, return_index=True)
+        counts = np.bincount(index, minlength=len(geometries))
+        offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+
+        return cls(coords[:, 0], coords[:, 1], offsets=offsets)
+
+    @classmethod
+    def concat(cls, arrays):
+        """
+        Combine a sequence of `RouteArray` into one.
+        """
+        arrays = list(arrays)
+        if len(arrays) == 0:
+            return cls([], [], offsets=[0])
+
+        shifts = np.cumsum([0] + [len(a.lon) for a in arrays[:-1]])
+        offsets = np.concatenate([[0]] + [a.offsets[1:] + s for a, s in zip(arrays, shifts)])
+
+        return cls(np.concatenate([a.lon for a in arrays]),
+                   np.concatenate([a.lat for a in arrays]),
+                   np.concatenate([a.timestamp for a in arrays]),
+                   offsets)
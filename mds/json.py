@@ -2,11 +2,15 @@
 Work with MDS Provider data as (Geo)JSON files and objects.
 """
 
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import fiona
 import json
+import mds
+from mds.geometry import extract_coords
+import numpy as np
 import os
-import pandas
+import pandas as pd
 from pathlib import Path
 import requests
 import shapely.geometry
@@ -33,7 +37,7 @@ def parse_boundary(boundary_file="boundary.geojson", downloads=None):
     # meld all the features together into a unified polygon
     features = fiona.open(boundary_file)
     polygons = [shapely.geometry.shape(feature["geometry"]) for feature in features]
-    polygons_meld = shapely.ops.cascaded_union(polygons)
+    polygons_meld = shapely.ops.unary_union(polygons)
 
     return shapely.geometry.Polygon(polygons_meld)
 
@@ -50,23 +54,25 @@ def to_feature(shape, properties={}):
 
     Optionally give the Feature a :properties: dict.
     """
-    feature = shapely.geometry.mapping(shape)
-    feature["properties"] = properties
+    geometry = shapely.geometry.mapping(shape)
 
     if isinstance(shape, shapely.geometry.Point):
-        feature["coordinates"] = list(feature["coordinates"])
+        geometry["coordinates"] = list(geometry["coordinates"])
     else:
         # assume shape is polygon (multipolygon will break)
-        feature["coordinates"] = [list(list(coords) for coords in part) for part in feature["coordinates"]]
+        geometry["coordinates"] = [list(list(coords) for coords in part) for part in geometry["coordinates"]]
 
-    return feature
+    return dict(type="Feature", properties=properties, geometry=geometry)
 
-def read_data_file(src, record_type):
+def read_data_file(src, record_type, schema=None):
     """
     Read data from the :src: MDS Provider JSON file, where :record_type: is one of
         - status_changes
         - trips
 
+    :schema: is an optional `ProviderSchema` of :record_type:. When given, the DataFrame
+    is typed according to the schema, see `typed_frame(df, schema)`.
+
     Return a tuple:
         - the version string
         - a DataFrame of the record collection
@@ -77,7 +83,90 @@ def read_data_file(src, record_type):
         payload = json.load(open(src, "r"))
 
     data = payload["data"][record_type]
-    return payload["version"], pd.DataFrame.from_records(data)
+    df = pd.DataFrame.from_records(data)
+
+    if schema is not None:
+        df = typed_frame(df, schema)
+
+    return payload["version"], df
+
+def read_data_files(srcs, record_type, schema=None, processes=None):
+    """
+    Read data from each of the :srcs: MDS Provider JSON files in parallel, combining the results.
+
+    :schema: is an optional `ProviderSchema` used to type each file's DataFrame, see `read_data_file()`.
+
+    :processes: is the number of worker processes to use. The default is the number of CPUs.
+
+    Return a tuple:
+        - the list of version strings, corresponding to :srcs:
+        - a DataFrame of the combined record collections
+    """
+    srcs = list(srcs)
+    if len(srcs) == 0:
+        return [], pd.DataFrame()
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(read_data_file, srcs, [record_type] * len(srcs), [schema] * len(srcs)))
+
+    versions = [version for version, _ in results]
+    frames = [df for _, df in results]
+
+    # categoricals with different categories would otherwise combine as object columns
+    categorical = [c for c in frames[0].columns if isinstance(frames[0][c].dtype, pd.CategoricalDtype)]
+    for col in categorical:
+        categories = pd.api.types.union_categoricals(
+            [df[col] for df in frames if col in df], ignore_order=True).categories
+        for df in frames:
+            if col in df:
+                df[col] = df[col].cat.set_categories(categories)
+
+    return versions, pd.concat(frames, ignore_index=True)
+
+def typed_frame(df, schema):
+    """
+    Convert the object columns of the records DataFrame :df: to compact types,
+    using the `ProviderSchema` :schema: for enumerated values:
+        - enums to categoricals, with the schema's values and any others found in :df:
+        - repeating ids (`provider_id`, `device_id`, `vehicle_id`) to categoricals
+        - times to `datetime64[ms, UTC]`
+        - `event_location` to float32 `event_lon` and `event_lat` columns
+        - `battery_pct` to float32
+
+    :returns: A new DataFrame.
+    """
+    enums = {
+        "vehicle_type": schema.vehicle_types(),
+        "event_type": schema.event_types(),
+        "event_type_reason": sorted(set(r for reasons in schema.event_type_reasons().values() for r in reasons))
+    }
+    times = ["event_time", "start_time", "end_time"]
+    ids = ["provider_name", "provider_id", "device_id", "vehicle_id"]
+
+    typed = {}
+    for col in df.columns:
+        values = df[col]
+
+        if col in enums and len(enums[col]) > 0:
+            # keep values the schema doesn't know (e.g. from a newer version) rather than losing them
+            unknown = sorted(set(values.dropna().astype(str)) - set(enums[col]))
+            if len(unknown) > 0:
+                print(f"Found {col} values not in the schema: {', '.join(unknown)}")
+            typed[col] = pd.Categorical(values, categories=enums[col] + unknown)
+        elif col in ids:
+            typed[col] = values.astype(str).where(values.notna()).astype("category")
+        elif col in times:
+            unit = "s" if pd.api.types.is_numeric_dtype(values) else None
+            typed[col] = pd.to_datetime(values, unit=unit, utc=True).astype("datetime64[ms, UTC]")
+        elif col == "event_location":
+            lon, lat = extract_coords(values.values)
+            typed["event_lon"], typed["event_lat"] = lon.astype(np.float32), lat.astype(np.float32)
+        elif col == "battery_pct":
+            typed[col] = pd.to_numeric(values).astype(np.float32)
+        else:
+            typed[col] = values
+
+    return pd.DataFrame(typed, index=df.index)
 
 
 class CustomJsonEncoder(json.JSONEncoder):
@@ -96,9 +185,7 @@ class CustomJsonEncoder(json.JSONEncoder):
            - `iso8601` to format dates as ISO 8601 strings
            - `<python format string>` for custom formats
         """
-        if "date_format" in kwargs:
-            self.date_format = kwargs["date_format"]
-            del kwargs["date_format"]
+        self.date_format = kwargs.pop("date_format", None)
 
         json.JSONEncoder.__init__(self, *args, **kwargs)
 
@@ -113,7 +200,7 @@ class CustomJsonEncoder(json.JSONEncoder):
             else:
                 return str(obj)
 
-        if isinstance(obj, Point) or isinstance(obj, Polygon):
+        if isinstance(obj, (shapely.geometry.Point, shapely.geometry.Polygon)):
             return to_feature(obj)
 
         if isinstance(obj, tuple):
@@ -123,3 +210,103 @@ class CustomJsonEncoder(json.JSONEncoder):
             return str(obj)
 
         return json.JSONEncoder.default(self, obj)
+
+
+class PagedJsonWriter():
+    """
+    Write a stream of records as MDS Provider payload files of a fixed number of records (pages),
+    each linking to the next with `links.next`.
+
+    Records are buffered for a single page at a time, so memory doesn't depend on the length of the stream:
+
+        with PagedJsonWriter("out", mds.TRIPS, page_size=1000) as writer:
+            for hour_trips in ...:
+                writer.write(hour_trips)
+    """
+
+    def __init__(self, directory, record_type, page_size=10000, base_url=None, version=None, **kwargs):
+        """
+        Initialize a new `PagedJsonWriter` into :directory:, which is created if needed.
+
+        :record_type: is one of
+            - status_changes
+            - trips
+
+        :page_size: is the number of records per file.
+
+        :base_url: is an optional prefix for the `links.next` file names, e.g. where the files will be served.
+
+        :version: is the payload's MDS version, by default `mds.MDS_VERSION()`.
+
+        Additional keyword arguments are passed to the `CustomJsonEncoder`, e.g. `date_format`.
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1.")
+
+        self.directory = Path(directory)
+        self.record_type = record_type
+        self.page_size = page_size
+        self.base_url = base_url
+        self.version = version or mds.MDS_VERSION()
+        self.encoder = CustomJsonEncoder(**kwargs)
+        self.pages = []
+        self._buffer = []
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # an interrupted stream is left without a last page, rather than ending early
+        if exc_type is None:
+            self.close()
+
+    def _name(self, page):
+        """
+        Get the file name of the :page: number.
+        """
+        return f"{self.record_type}_{page:06d}.json"
+
+    def _flush(self, last=False):
+        """
+        Write out a full page of the buffer, or the rest of it if this is the :last: page.
+
+        A full page is only written once a record after it arrives, so that `links.next` is
+        only set when the next page exists.
+        """
+        records, self._buffer = self._buffer[:self.page_size], self._buffer[self.page_size:]
+
+        name = self._name(len(self.pages))
+        payload = dict(version=self.version, data={self.record_type: records})
+        if not last:
+            payload["links"] = dict(next=f"{self.base_url or ''}{self._name(len(self.pages) + 1)}")
+
+        # write to a temporary file first, so a page is never seen half written
+        path, tmp = self.directory / name, self.directory / f".{name}.tmp"
+        with tmp.open("w") as f:
+            for chunk in self.encoder.iterencode(payload):
+                f.write(chunk)
+        tmp.replace(path)
+
+        self.pages.append(path)
+
+    def write(self, records):
+        """
+        Write the iterable of :records:, writing out each page once it's full.
+        """
+        for record in records:
+            if len(self._buffer) == self.page_size:
+                self._flush()
+            self._buffer.append(record)
+
+    def close(self):
+        """
+        Write out the last page, even if empty when no records were written.
+
+        :returns: The list of file paths written.
+        """
+        if self._buffer or not self.pages:
+            self._flush(last=True)
+
+        return self.pages
@@ -0,0 +1,187 @@
+"""
+Work with MDS Provider data as partitioned Parquet datasets.
+"""
+
+from datetime import datetime
+import mds
+from mds.geometry import RouteArray, extract_coords
+import numpy as np
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import uuid
+
+
+ENUM_COLS = ["provider_name", "vehicle_type", "event_type", "event_type_reason"]
+
+UUID_COLS = ["provider_id", "device_id", "trip_id"]
+
+PARTITIONING = ds.partitioning(pa.schema([("provider_name", pa.string()), ("date", pa.string())]), flavor="hive")
+
+PARTITION_TIME = {
+    mds.STATUS_CHANGES: "event_time",
+    mds.TRIPS: "start_time"
+}
+
+TIME_COLS = {
+    mds.STATUS_CHANGES: ["event_time"],
+    mds.TRIPS: ["start_time", "end_time"]
+}
+
+TIMESTAMP = pa.timestamp("ms", tz="UTC")
+
+ROUTE_POINT = pa.struct([("lon", pa.float64()), ("lat", pa.float64()), ("timestamp", TIMESTAMP)])
+
+
+def _to_datetime(values):
+    """
+    Helper converts an array of Unix seconds or datetimes to a UTC datetime Series.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_datetime(values, unit="s", utc=True)
+    return pd.to_datetime(values, utc=True)
+
+def _to_timestamps(seconds):
+    """
+    Helper converts a float array of Unix seconds (NaN for missing) to a timestamp[ms, UTC] array.
+    """
+    missing = np.isnan(seconds)
+    millis = np.where(missing, 0, np.round(seconds * 1000)).astype(np.int64)
+    return pa.array(millis, type=pa.int64(), mask=missing).cast(TIMESTAMP)
+
+def _list_array(values, value_type=pa.string(), dictionary=False):
+    """
+    Helper converts a sequence of lists (or None) to a list array, optionally dictionary encoding the items.
+    """
+    lists = [v if isinstance(v, (list, tuple)) else None for v in values]
+    array = pa.array(lists, type=pa.list_(value_type))
+
+    if dictionary:
+        items = array.flatten().dictionary_encode()
+        array = pa.ListArray.from_arrays(array.offsets, items, mask=array.is_null())
+
+    return array
+
+def to_table(df, record_type):
+    """
+    Convert the DataFrame :df: of :record_type: records into a `pyarrow.Table` with:
+        - dictionary encoding for enum columns
+        - timestamp[ms, UTC] time columns
+        - `event_location` as `event_lon` and `event_lat` float columns
+        - `route` as a list of (lon, lat, timestamp) points
+        - a `date` partitioning column
+    """
+    columns = {}
+
+    for col in df.columns:
+        values = df[col]
+
+        if col in ENUM_COLS:
+            columns[col] = pa.array(values.values, type=pa.string(), from_pandas=True).dictionary_encode()
+        elif col == "propulsion_type":
+            columns[col] = _list_array(values.values, dictionary=True)
+        elif col == "associated_trips":
+            columns[col] = _list_array([[str(t) for t in v] if isinstance(v, (list, tuple, np.ndarray)) else None
+                                        for v in values.values])
+        elif col in TIME_COLS[record_type]:
+            columns[col] = pa.array(_to_datetime(values)).cast(TIMESTAMP)
+        elif col == "event_location":
+            lon, lat = extract_coords(values.values)
+            columns["event_lon"], columns["event_lat"] = pa.array(lon), pa.array(lat)
+        elif col == "route":
+            routes = RouteArray.from_geojson(values.values)
+            points = pa.StructArray.from_arrays(
+                [pa.array(routes.lon), pa.array(routes.lat), _to_timestamps(routes.timestamp)],
+                fields=list(ROUTE_POINT))
+            columns[col] = pa.ListArray.from_arrays(pa.array(routes.offsets, type=pa.int32()), points)
+        elif col in UUID_COLS:
+            columns[col] = pa.array([None if v is None else str(v) for v in values.values], type=pa.string())
+        else:
+            columns[col] = pa.array(values.values, from_pandas=True)
+
+    # the partitioning date, from the record's primary time column
+    time_col = PARTITION_TIME[record_type]
+    columns["date"] = pa.array(_to_datetime(df[time_col]).dt.strftime("%Y-%m-%d").values, type=pa.string())
+
+    return pa.table(columns)
+
+def write_parquet(df, record_type, root, max_rows_per_file=1000000):
+    """
+    Write the DataFrame (or list of records) :df: of :record_type: to the Parquet dataset at :root:.
+
+    The dataset is laid out in Hive-style partitions:
+
+        root/record_type/provider_name=<name>/date=<YYYY-MM-DD>/<file>.parquet
+
+    Each call adds new files, so repeated calls for the same partitions append to them.
+    """
+    if isinstance(df, list):
+        df = pd.DataFrame.from_records(df)
+
+    table = to_table(df, record_type)
+
+    # partition keys are written to the directory names as plain strings
+    table = table.set_column(table.schema.get_field_index("provider_name"),
+                             "provider_name", table["provider_name"].cast(pa.string()))
+
+    ds.write_dataset(table,
+                     os.path.join(str(root), record_type),
+                     format="parquet",
+                     partitioning=PARTITIONING,
+                     basename_template=f"{uuid.uuid4().hex}-{{i}}.parquet",
+                     existing_data_behavior="overwrite_or_ignore",
+                     max_rows_per_file=max_rows_per_file,
+                     max_rows_per_group=min(max_rows_per_file, 128 * 1024))
+
+def dataset(root, record_type):
+    """
+    Open the Parquet dataset of :record_type: at :root: as a `pyarrow.dataset.Dataset`.
+    """
+    return ds.dataset(os.path.join(str(root), record_type), format="parquet", partitioning=PARTITIONING)
+
+def read_parquet(root, record_type, columns=None, providers=None, start_time=None, end_time=None, filter=None):
+    """
+    Read :record_type: data from the Parquet dataset at :root: into a DataFrame.
+
+    :columns: is an optional list of columns to read.
+
+    :providers: is an optional list of provider names to read.
+
+    :start_time: and :end_time: optionally limit the records to a range of the record's primary
+    time column (`event_time` or `start_time`), given as datetimes or Unix seconds.
+
+    :filter: is an optional additional `pyarrow.compute.Expression`.
+
+    Provider and time filters prune whole partitions before the remaining filters are pushed
+    down to the Parquet row groups.
+    """
+    def __timestamp(t):
+        """
+        Convert :t: (datetime or Unix seconds) to a UTC Timestamp.
+        """
+        ts = pd.Timestamp(t) if isinstance(t, datetime) else pd.Timestamp(t, unit="s")
+        return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+    expressions = []
+    time_col = ds.field(PARTITION_TIME[record_type])
+
+    if providers is not None:
+        expressions.append(ds.field("provider_name").isin(list(providers)))
+    if start_time is not None:
+        start = __timestamp(start_time)
+        expressions.append(ds.field("date") >= start.strftime("%Y-%m-%d"))
+        expressions.append(time_col >= pa.scalar(start.to_pydatetime(), type=TIMESTAMP))
+    if end_time is not None:
+        end = __timestamp(end_time)
+        expressions.append(ds.field("date") <= end.strftime("%Y-%m-%d"))
+        expressions.append(time_col <= pa.scalar(end.to_pydatetime(), type=TIMESTAMP))
+    if filter is not None:
+        expressions.append(filter)
+
+    expression = None
+    for e in expressions:
+        expression = e if expression is None else expression & e
+
+    table = dataset(root, record_type).to_table(columns=columns, filter=expression)
+    return table.to_pandas()
@@ -0,0 +1,157 @@
+"""
+Stream MDS Provider data from API endpoints straight into a database.
+"""
+
+import mds
+import queue
+import threading
+
+
+class ProviderPipeline():
+    """
+    Connects a `ProviderClient` to a `ProviderDataLoader` through bounded queues, so that
+    fetching, validating and loading pages run at the same time in constant memory.
+    """
+
+    DONE = object()
+
+    def __init__(self, client, loader, validator=None, queue_size=4):
+        """
+        Initialize a new `ProviderPipeline`.
+
+        :client: is the `ProviderClient` used to fetch pages.
+
+        :loader: is the `ProviderDataLoader` used to load pages.
+
+        :validator: is an optional `ProviderDataValidator` for the record type being loaded.
+        Records with validation errors are dropped, as are pages with page-level errors.
+
+        :queue_size: is the number of pages each stage may get ahead of the next. When a
+        queue is full, the stage feeding it waits.
+        """
+        self.client = client
+        self.loader = loader
+        self.validator = validator
+        self.queue_size = queue_size
+
+    def _put(self, q, item, stop):
+        """
+        Put :item: on the queue :q:, waiting while it is full unless the pipeline is stopping.
+
+        :returns: False if the pipeline stopped before the item could be queued.
+        """
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(self, q):
+        """
+        Yield items from the queue :q: until the end of the stream.
+        """
+        while True:
+            item = q.get()
+            if item is self.DONE:
+                return
+            yield item
+
+    def _stage(self, name, items, q, stop, errors):
+        """
+        Start a thread named :name: that puts each of :items: on the queue :q:, then ends the stream.
+
+        Exceptions are recorded in :errors: and stop the pipeline.
+        """
+        def __run():
+            try:
+                for item in items:
+                    if not self._put(q, item, stop):
+                        break
+            except Exception as error:
+                errors.append(error)
+                stop.set()
+            finally:
+                # end the stream, discarding queued items if the pipeline is stopping
+                while True:
+                    try:
+                        q.put(self.DONE, timeout=0.1)
+                        break
+                    except queue.Full:
+                        if stop.is_set():
+                            try:
+                                q.get_nowait()
+                            except queue.Empty:
+                                pass
+
+        thread = threading.Thread(target=__run, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def _validate(self, pages, record_type):
+        """
+        Validate each (provider, page) from :pages:, yielding it with invalid records removed.
+        """
+        for provider, page in pages:
+            errors = list(self.validator.validate(page))
+            if len(errors) == 0:
+                yield provider, page
+                continue
+
+            # errors at or below data.record_type[i] belong to a single record
+            item_errors = [e for e in errors
+                           if len(e.path) >= 3 and e.path[:2] == ["data", record_type] and isinstance(e.path[2], int)]
+            if len(item_errors) < len(errors):
+                print(f"Skipping invalid page from {provider.provider_name}:")
+                for e in errors:
+                    print(e.describe())
+                continue
+
+            invalid = set(e.path[2] for e in item_errors)
+            records = [r for i, r in enumerate(page["data"][record_type]) if i not in invalid]
+            print(f"Dropping {len(invalid)} invalid {record_type} from {provider.provider_name}")
+
+            yield provider, {**page, "data": {**page["data"], record_type: records}}
+
+    def run(self, record_type, table=None, before_load=None, batch_size=None, **kwargs):
+        """
+        Fetch and load :record_type: data.
+
+        :table: is the destination table. The default is the :record_type:.
+
+        :before_load: and :batch_size: are passed to the loader,
+        see `ProviderDataLoader.load_status_changes()` and `ProviderDataLoader.load_trips()`.
+
+        Any other keyword arguments are passed to the client,
+        see `ProviderClient.get_status_changes()` and `ProviderClient.get_trips()`.
+        """
+        if record_type == mds.STATUS_CHANGES:
+            pages = self.client.get_status_changes(stream=True, **kwargs)
+            load = self.loader.load_status_changes
+        elif record_type == mds.TRIPS:
+            pages = self.client.get_trips(stream=True, **kwargs)
+            load = self.loader.load_trips
+        else:
+            raise ValueError(f"Invalid record_type '{record_type}'.")
+
+        stop, errors = threading.Event(), []
+        fetched = queue.Queue(maxsize=self.queue_size)
+        threads = [self._stage("mds-fetch", pages, fetched, stop, errors)]
+        stream = self._drain(fetched)
+
+        if self.validator is not None:
+            validated = queue.Queue(maxsize=self.queue_size)
+            threads.append(self._stage("mds-validate", self._validate(stream, record_type), validated, stop, errors))
+            stream = self._drain(validated)
+
+        try:
+            load(stream, table=table or record_type, before_load=before_load, batch_size=batch_size)
+        finally:
+            # let the upstream stages finish, even if loading failed
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        if len(errors) > 0:
+            raise errors[0]
@@ -39,7 +39,7 @@ class ProviderSchema():
             raise ValueError(f"Invalid schema url: {self.schema_url}")
 
         # override the $id for a non-standard ref
-        if self.ref is not self.DEFAULT_REF:
+        if self.ref != self.DEFAULT_REF:
             self.schema["$id"] = self.schema_url
 
     def event_types(self):
@@ -53,7 +53,7 @@ class ProviderSchema():
         Get a dict of `event_type` => `[event_type_reason]` for this schema.
         """
         etr = {}
-        if self.schema_type is not mds.STATUS_CHANGES:
+        if self.schema_type != mds.STATUS_CHANGES:
             return etr
 
         item_schema = self.item_schema()
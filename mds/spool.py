@@ -0,0 +1,230 @@
+"""
+Spool fetched MDS Provider data pages to disk, to load them later or elsewhere.
+
+A spool is a directory with a folder per provider, each holding numbered segment files and an index:
+
+    root/<provider_name>/00000000.spool
+    root/<provider_name>/00000001.spool
+    root/<provider_name>/index.jsonl
+
+Each page is a record in a segment: a header with the length and CRC-32 of the payload,
+followed by the zlib-compressed JSON of the page. The index has a line of JSON per page,
+written after its record, giving its segment, offset, length, record type and digest.
+"""
+
+import hashlib
+import json
+import mds
+from mds.providers import Provider
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+
+
+HEADER = struct.Struct("<II")
+
+INDEX = "index.jsonl"
+
+
+class PageSpool():
+    """
+    Append data pages to, and read them back from, a spool directory.
+    """
+
+    def __init__(self, root, segment_bytes=64 * 1024 * 1024, level=6):
+        """
+        Initialize a new `PageSpool` at the directory :root:, which is created if needed.
+
+        :segment_bytes: is the size at which a provider's segment is closed and a new one started.
+
+        :level: is the zlib compression level of the pages.
+        """
+        self.root = str(root)
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self.lock = threading.Lock()
+        self._writers = {}
+        self._maps = {}
+
+        os.makedirs(self.root, exist_ok=True)
+
+    def _folder(self, provider):
+        """
+        Get the folder name of the :provider: (a `Provider` or name).
+        """
+        name = provider.provider_name if isinstance(provider, Provider) else str(provider)
+        return re.sub(r"[^\w.-]+", "_", name)
+
+    def _writer(self, folder):
+        """
+        Get the (segment number, file) being appended to in :folder:, recovering from an interrupted write.
+
+        Bytes after the last indexed record of the last segment belong to a page that was never
+        indexed, and are truncated.
+        """
+        if folder in self._writers:
+            return self._writers[folder]
+
+        path = os.path.join(self.root, folder)
+        os.makedirs(path, exist_ok=True)
+
+        entries = list(self._read_index(folder))
+        segment = entries[-1]["segment"] if entries else 0
+        end = max((e["offset"] + HEADER.size + e["length"] for e in entries if e["segment"] == segment), default=0)
+
+        f = open(os.path.join(path, f"{segment:08d}.spool"), "ab")
+        f.truncate(end)
+        f.seek(end)
+
+        self._writers[folder] = segment, f
+        return self._writers[folder]
+
+    def _read_index(self, folder):
+        """
+        Yield the index entries of :folder:, ignoring an incomplete last line.
+        """
+        path = os.path.join(self.root, folder, INDEX)
+        if not os.path.exists(path):
+            return
+
+        with open(path, "r") as f:
+            for line in f:
+                if line.endswith("\n"):
+                    yield json.loads(line)
+
+    def append(self, provider, page):
+        """
+        Append the data :page: fetched from :provider: (a `Provider` or name) to its current segment.
+
+        :returns: The page's index entry.
+        """
+        data = json.dumps(page, separators=(",", ":"), default=str).encode()
+        payload = zlib.compress(data, self.level)
+        record_types = [r for r in (mds.STATUS_CHANGES, mds.TRIPS) if r in page.get("data", {})]
+
+        folder = self._folder(provider)
+
+        with self.lock:
+            segment, f = self._writer(folder)
+
+            if f.tell() > 0 and f.tell() + HEADER.size + len(payload) > self.segment_bytes:
+                f.close()
+                segment += 1
+                f = open(os.path.join(self.root, folder, f"{segment:08d}.spool"), "ab")
+                self._writers[folder] = segment, f
+
+            entry = dict(
+                provider=folder,
+                segment=segment,
+                offset=f.tell(),
+                length=len(payload),
+                crc=zlib.crc32(payload),
+                record_type=record_types[0] if record_types else None,
+                records=sum(len(page["data"][r]) for r in record_types),
+                digest=hashlib.sha256(data).hexdigest())
+
+            f.write(HEADER.pack(len(payload), entry["crc"]))
+            f.write(payload)
+            f.flush()
+
+            # the index line is only written once its record is complete
+            with open(os.path.join(self.root, folder, INDEX), "a") as index:
+                index.write(json.dumps(entry) + "\n")
+
+        return entry
+
+    def spool(self, source):
+        """
+        Append each page from :source: to the spool, where :source: is:
+            - an iterator of (Provider, data page), e.g. `ProviderClient.get_trips(stream=True)`
+            - a dict of Provider => list of data pages
+
+        :returns: The number of pages appended.
+        """
+        items = ((p, page) for p, pages in source.items() for page in pages) if isinstance(source, dict) else source
+        count = 0
+
+        for provider, page in items:
+            self.append(provider, page)
+            count += 1
+
+        return count
+
+    def close(self):
+        """
+        Close the segments being appended to, and the memory maps of the segments read.
+        """
+        with self.lock:
+            for _, f in self._writers.values():
+                f.close()
+            for m in self._maps.values():
+                m.close()
+            self._writers, self._maps = {}, {}
+
+    def providers(self):
+        """
+        Get the list of provider folders in the spool.
+        """
+        return sorted(d for d in os.listdir(self.root) if os.path.exists(os.path.join(self.root, d, INDEX)))
+
+    def entries(self, providers=None, record_type=None):
+        """
+        Yield the index entries of the spool, in the order they were appended for each provider.
+
+        :providers: is an optional list of `Provider` or names to limit the entries to.
+
+        :record_type: optionally limits the entries to pages of that record type.
+        """
+        folders = self.providers() if providers is None else [self._folder(p) for p in providers]
+
+        for folder in folders:
+            for entry in self._read_index(folder):
+                if record_type is None or entry["record_type"] == record_type:
+                    yield entry
+
+    def _map(self, folder, segment, end):
+        """
+        Get a read-only memory map of the :segment: of :folder: covering at least :end: bytes.
+
+        Must be called holding the lock, since a map that's too short is closed and replaced.
+        """
+        key = (folder, segment)
+        m = self._maps.get(key)
+
+        if m is None or len(m) < end:
+            if m is not None:
+                m.close()
+            with open(os.path.join(self.root, folder, f"{segment:08d}.spool"), "rb") as f:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[key] = m
+
+        return m
+
+    def read(self, entry):
+        """
+        Read the data page of the index :entry:.
+
+        Raises a `ValueError` if the record is corrupt.
+        """
+        start = entry["offset"] + HEADER.size
+
+        # copy the record out under the lock, so another reader can't remap the segment mid-read
+        with self.lock:
+            m = self._map(entry["provider"], entry["segment"], start + entry["length"])
+            length, crc = HEADER.unpack_from(m, entry["offset"])
+            payload = m[start:start + length]
+
+        if length != entry["length"] or zlib.crc32(payload) != crc:
+            raise ValueError(f"Corrupt page at {entry['provider']}/{entry['segment']:08d}.spool@{entry['offset']}")
+
+        return json.loads(zlib.decompress(payload))
+
+    def pages(self, providers=None, record_type=None):
+        """
+        Yield a tuple of (index entry, data page) for each page of the spool, see `entries()`.
+        """
+        for entry in self.entries(providers=providers, record_type=record_type):
+            yield entry, self.read(entry)
@@ -34,10 +34,14 @@ setup(
         "pandas",
         "psycopg2-binary",
         "requests",
-        "scipy",
-        "Shapely",
+        "Shapely >= 2.0",
         "sqlalchemy"
     ],
+    extras_require={
+        "duckdb": ["duckdb", "duckdb-engine"],
+        "orjson": ["orjson"],
+        "parquet": ["pyarrow"]
+    },
     classifiers=[
         "Environment :: Docker",
         "Intended Audience :: Developers",
@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+import mds
+from mds.schema import ProviderSchema
+import pytest
+
+
+def make_schema(schema_type):
+    """
+    Create a minimal `ProviderSchema` of :schema_type: without fetching it.
+    """
+    schema = ProviderSchema.__new__(ProviderSchema)
+    schema.schema_type = schema_type
+    schema.ref = ProviderSchema.DEFAULT_REF
+    schema.schema_url = ProviderSchema.url(schema_type)
+
+    items = {"required": ["provider_id"], "properties": {"provider_id": {}, "battery_pct": {"type": "number"}}, "oneOf": [
+        {"properties": {"event_type": {"enum": ["available"]},
+                        "event_type_reason": {"enum": ["service_start", "user_drop_off"]}}},
+        {"properties": {"event_type": {"enum": ["reserved"]},
+                        "event_type_reason": {"enum": ["user_pick_up"]}}}
+    ]}
+    schema.schema = {
+        "required": ["version", "data"],
+        "definitions": {
+            "vehicle_type": {"enum": ["bicycle", "scooter"]},
+            "propulsion_type": {"items": {"enum": ["human", "electric"]}}
+        },
+        "properties": {
+            "version": {"type": "string"},
+            "data": {"properties": {schema_type: {"items": items}}}
+        }
+    }
+    return schema
+
+
+@pytest.fixture
+def status_changes_schema():
+    return make_schema(mds.STATUS_CHANGES)
+
+
+@pytest.fixture
+def trips_schema():
+    return make_schema(mds.TRIPS)
+
+
+def point(lon, lat, timestamp):
+    """
+    Create a GeoJSON Point Feature with a timestamp.
+    """
+    return dict(type="Feature", properties=dict(timestamp=timestamp),
+                geometry=dict(type="Point", coordinates=[lon, lat]))
+
+
+def status_change(**kwargs):
+    """
+    Create a status_change record, with :kwargs: overriding its fields.
+    """
+    event_time = datetime(2019, 1, 1, 12, tzinfo=timezone.utc)
+    record = dict(provider_id="0d1d5d4b-5e8c-4a39-9d09-1c34c2b9b5a3",
+                  provider_name="Test",
+                  device_id="8d2c1f6e-0c6a-4d6b-a1a2-5a1f6d7a8b9c",
+                  vehicle_id="ABC123",
+                  vehicle_type="scooter",
+                  propulsion_type=["electric"],
+                  event_type="available",
+                  event_type_reason="service_start",
+                  event_time=event_time,
+                  event_location=point(-118.49, 34.02, event_time))
+    record.update(kwargs)
+    return record
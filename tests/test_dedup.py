@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+import mds
+from mds.db.dedup import BloomFilter, KeyIndex, filter_known, key_hashes
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def status_changes(device_ids, event_times):
+    return pd.DataFrame(dict(device_id=device_ids, event_time=event_times, event_type="available"))
+
+
+def test_key_hashes_normalize_keys():
+    seconds = key_hashes(status_changes(["ABC", "abc"], [1546344000.0, 1546344000.0]), mds.STATUS_CHANGES)
+    times = key_hashes(status_changes(["abc"], [datetime(2019, 1, 1, 12, tzinfo=timezone.utc)]), mds.STATUS_CHANGES)
+
+    assert seconds.dtype == np.uint64
+    assert seconds[0] == seconds[1] == times[0]
+    trips = key_hashes(pd.DataFrame(dict(trip_id=["T1", "t1"])), mds.TRIPS)
+    assert trips[0] == trips[1]
+
+    with pytest.raises(ValueError):
+        key_hashes(pd.DataFrame(), "vehicles")
+
+
+@pytest.mark.parametrize("index", [KeyIndex(), BloomFilter(1000)], ids=["keys", "bloom"])
+def test_filter_known(index):
+    df = status_changes(["a", "b", "a", "c"], [1, 2, 1, 3])
+
+    new, hashes = filter_known(df, mds.STATUS_CHANGES, index)
+    assert new["device_id"].tolist() == ["a", "b", "c"]
+
+    index.add(hashes)
+    assert len(index) == 3
+
+    new, _ = filter_known(status_changes(["a", "d"], [1, 4]), mds.STATUS_CHANGES, index)
+    assert new["device_id"].tolist() == ["d"]
+
+
+def test_bloom_filter_error_rate():
+    rng = np.random.default_rng(1)
+    added, other = rng.integers(0, 2**63, size=(2, 10000), dtype=np.uint64)
+
+    bloom = BloomFilter(len(added), error_rate=1e-3)
+    bloom.add(added)
+
+    assert bloom.contains(added).all()
+    assert bloom.contains(other).mean() < 1e-2
+    assert bloom.nbytes < 10000 * 8
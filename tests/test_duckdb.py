@@ -0,0 +1,144 @@
+from conftest import point
+from datetime import datetime
+import mds
+import pytest
+import uuid
+
+pytest.importorskip("duckdb")
+pytest.importorskip("duckdb_engine")
+from mds.db import ProviderDataLoader, ProviderDataLoadError, ProviderDataReader
+import pandas as pd
+import sqlalchemy
+
+
+def status_changes(N):
+    provider_id = str(uuid.uuid4())
+    return [dict(provider_id=provider_id, provider_name="Test", device_id=str(uuid.uuid4()), vehicle_id=f"V{i}",
+                 vehicle_type="scooter", propulsion_type=["electric"], event_type="available",
+                 event_type_reason="service_start", event_time=1546300800 + i,
+                 event_location=point(-118.49, 34.02, 1546300800 + i), battery_pct=0.5,
+                 associated_trips=[str(uuid.uuid4())] if i % 2 else None)
+            for i in range(N)]
+
+
+def trips(N):
+    provider_id = str(uuid.uuid4())
+    return [dict(provider_id=provider_id, provider_name="Test", device_id=str(uuid.uuid4()), vehicle_id=f"V{i}",
+                 vehicle_type="bicycle", propulsion_type=["human"], trip_id=str(uuid.uuid4()),
+                 trip_duration=600, trip_distance=1000, accuracy=5,
+                 start_time=1546300800 + i, end_time=1546301400 + i,
+                 route=dict(type="FeatureCollection", features=[point(-118.49, 34.02, 1546300800 + i),
+                                                                point(-118.48, 34.01, 1546301400 + i)]))
+            for i in range(N)]
+
+
+def page(record_type, records):
+    return dict(version="0.3.0", data={record_type: records})
+
+
+def count(loader, table):
+    with loader.engine.connect() as conn:
+        return conn.execute(sqlalchemy.text(f'SELECT count(*) FROM "{table}"')).scalar()
+
+
+def test_load_into_duckdb(tmp_path, status_changes_schema, trips_schema):
+    loader = ProviderDataLoader(f"duckdb:///{tmp_path / 'mds.duckdb'}")
+    loader.create_tables(status_changes_schema, trips_schema)
+    assert loader.dialect == "duckdb"
+
+    sc, tr = status_changes(100), trips(100)
+
+    # loading twice skips the conflicting records
+    for _ in range(2):
+        loader.load_status_changes(page(mds.STATUS_CHANGES, sc), batch_size=40)
+        loader.load_trips(page(mds.TRIPS, tr), batch_size=40)
+
+    assert count(loader, mds.STATUS_CHANGES) == 100
+    assert count(loader, mds.TRIPS) == 100
+
+    # the second load of the trips staged every record and inserted none
+    summary = loader.last_stats.summary()
+    assert summary["stage"]["rows"] == summary["upsert"]["rows"] == 100
+    assert summary["upsert"]["calls"] == 1
+    assert summary["upsert"]["inserted"] == 0 and summary["upsert"]["conflicted"] == 100
+
+    with loader.engine.connect() as conn:
+        row = conn.execute(sqlalchemy.text(
+            "SELECT associated_trips, propulsion_type, event_time FROM status_changes WHERE vehicle_id = 'V1'")).one()
+
+    assert [str(t) for t in row[0]] == sc[1]["associated_trips"]
+    assert list(row[1]) == ["electric"]
+    assert row[2].replace(tzinfo=None) == datetime(2019, 1, 1, 0, 0, 1)
+
+
+def test_duckdb_rejects_postgres_options(tmp_path):
+    with pytest.raises(ValueError):
+        ProviderDataLoader(f"duckdb:///{tmp_path / 'mds.duckdb'}", rollups=True)
+
+
+def test_failed_batch_names_the_bad_page(tmp_path, status_changes_schema, trips_schema):
+    loader = ProviderDataLoader(f"duckdb:///{tmp_path / 'mds.duckdb'}", dedup=True)
+    loader.create_tables(status_changes_schema, trips_schema)
+
+    pages = [page(mds.TRIPS, trips(10)) for _ in range(4)]
+    pages[2]["data"][mds.TRIPS][5]["vehicle_type"] = "hoverboard"
+
+    with pytest.raises(ProviderDataLoadError) as e:
+        loader.load_trips(pages, batch_size=20)
+
+    assert e.value.origins == ["source, page 2"]
+    assert count(loader, mds.TRIPS) == 20
+
+    # the checks committed nothing, and didn't mark the records of the failed batch as loaded
+    pages[2]["data"][mds.TRIPS][5]["vehicle_type"] = "bicycle"
+    loader.load_trips(pages[2:], batch_size=20)
+    assert count(loader, mds.TRIPS) == 40
+
+
+def test_read_from_duckdb(tmp_path, status_changes_schema, trips_schema):
+    loader = ProviderDataLoader(f"duckdb:///{tmp_path / 'mds.duckdb'}")
+    loader.create_tables(status_changes_schema, trips_schema)
+
+    sc, tr = status_changes(50), trips(50)
+    loader.load_status_changes(page(mds.STATUS_CHANGES, sc))
+    loader.load_trips(page(mds.TRIPS, tr))
+
+    reader = ProviderDataReader(engine=loader.engine)
+
+    # [start_time, end_time) of the event times, for the provider
+    chunks = list(reader.read_status_changes(start_time=1546300810, end_time=datetime(2019, 1, 1, 0, 0, 40),
+                                             providers=[sc[0]["provider_id"]], chunksize=20))
+    df = pd.concat(chunks, ignore_index=True)
+
+    assert [len(c) for c in chunks] == [20, 10]
+    assert df["vehicle_id"].tolist() == [f"V{i}" for i in range(10, 40)]
+    assert str(df["event_time"].dtype) == "datetime64[ms, UTC]"
+    assert isinstance(df["event_type"].dtype, pd.CategoricalDtype)
+    assert df["event_lon"].dtype == "float32" and "event_location" not in df
+    assert sum(len(c) for c in reader.read_status_changes(providers=["00000000-0000-0000-0000-000000000000"])) == 0
+
+    chunks = list(reader.read_trips(columns=["trip_id", "route", "start_time"], chunksize=30))
+
+    assert [len(df) for df, _ in chunks] == [30, 20]
+    df, routes = chunks[0]
+    assert list(df.columns) == ["trip_id", "start_time"]
+    assert len(routes) == 30 and routes.counts.tolist() == [2] * 30
+    assert routes.timestamp[0] == tr[0]["start_time"]
+
+
+def test_failed_partition_leaves_the_others(tmp_path, status_changes_schema, trips_schema):
+    loader = ProviderDataLoader(f"duckdb:///{tmp_path / 'mds.duckdb'}", ledger=True)
+    loader.create_tables(status_changes_schema, trips_schema)
+
+    # a day of trips per partition, with a bad record on the second day
+    records = trips(30)
+    for i, trip in enumerate(records):
+        trip["start_time"] += (i // 10) * 86400
+    records[15]["vehicle_type"] = "hoverboard"
+
+    results = loader.load_trips(page(mds.TRIPS, records), workers=3)
+
+    assert [r["rows"] for r in results] == [10, 10, 10]
+    assert ["error" in r for r in results] == [False, True, False]
+    assert count(loader, mds.TRIPS) == 20
+    assert count(loader, "load_ledger") == 0
@@ -0,0 +1,76 @@
+from mds.fake import geometry
+from mds.fake.geometry import point_nearby, points_nearby, points_within
+import numpy as np
+import pytest
+import random
+import shapely
+from shapely.geometry import Point, Polygon, box
+
+
+# an L-shaped boundary with a hole, so its bounds are a poor fit
+BOUNDARY = Polygon([(0, 0), (2, 0), (2, 1), (1, 1), (1, 2), (0, 2)],
+                   holes=[[(0.25, 0.25), (0.75, 0.25), (0.75, 0.75), (0.25, 0.75)]])
+
+
+def test_points_within():
+    lon, lat = points_within(BOUNDARY, 5000, rng=np.random.default_rng(1))
+
+    assert len(lon) == len(lat) == 5000
+    assert shapely.intersects_xy(BOUNDARY, lon, lat).all()
+
+    # uniform: the east arm of the L holds 1 of the boundary's 2.75 square units
+    assert abs((lon > 1).mean() - 1 / BOUNDARY.area) < 0.03
+
+
+def test_points_within_is_reproducible():
+    first = points_within(BOUNDARY, 100, rng=random.Random(7))
+    second = points_within(BOUNDARY, 100, rng=random.Random(7))
+
+    assert np.array_equal(first, second)
+
+
+def test_points_within_weights():
+    def __east(lon, lat):
+        return np.where(lon > 1, 9.0, 1.0)
+
+    lon, lat = points_within(box(0, 0, 2, 1), 5000, weights=__east, rng=np.random.default_rng(1))
+
+    assert shapely.intersects_xy(box(0, 0, 2, 1), lon, lat).all()
+    assert abs((lon > 1).mean() - 0.9) < 0.03
+
+
+@pytest.mark.parametrize("boundary", [BOUNDARY, Point(0, 0).buffer(1).difference(Point(0.5, 0).buffer(0.8))],
+                         ids=["l-shape", "crescent"])
+def test_points_within_without_constrained_triangulation(monkeypatch, boundary):
+    # Shapely < 2.1
+    monkeypatch.delattr(shapely, "constrained_delaunay_triangles", raising=False)
+    geometry._triangles.cache_clear()
+
+    try:
+        assert np.isclose(geometry._areas(geometry._triangles(boundary)).sum(), boundary.area)
+
+        lon, lat = points_within(boundary, 1000, weights=lambda lon, lat: lon + 2, rng=np.random.default_rng(1))
+        assert shapely.intersects_xy(boundary, lon, lat).all()
+    finally:
+        geometry._triangles.cache_clear()
+
+
+def test_points_nearby_matches_point_nearby():
+    lon, lat = points_nearby([-118.49, 0.0], [34.02, 0.0], [500, 1000], bearing=[0.5, 2.0])
+
+    for i, (x, y, dist, bearing) in enumerate([(-118.49, 34.02, 500, 0.5), (0.0, 0.0, 1000, 2.0)]):
+        expected = point_nearby(Point(x, y), dist, bearing=bearing)
+        assert np.allclose([lon[i], lat[i]], [expected.x, expected.y])
+
+
+@pytest.mark.parametrize("mode", ["clip", "reflect"])
+def test_points_nearby_within_boundary(mode):
+    start_lon, start_lat = points_within(BOUNDARY, 1000, rng=np.random.default_rng(1))
+    lon, lat = points_nearby(start_lon, start_lat, 50000, rng=np.random.default_rng(2), boundary=BOUNDARY, mode=mode)
+
+    assert shapely.intersects_xy(BOUNDARY, lon, lat).all()
+
+
+def test_points_nearby_unknown_mode():
+    with pytest.raises(ValueError):
+        points_nearby([0.0], [0.0], 1e6, boundary=BOUNDARY, mode="wrap")
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+from mds.fake.fleet import EVENTS, SERVICE_END, SERVICE_START, FleetSimulator
+import numpy as np
+from shapely.geometry import Point
+
+
+BOUNDARY = Point(-118.49, 34.02).buffer(0.05)
+
+
+def devices(N):
+    return [dict(provider_name="Test", device_id=str(i), vehicle_type="scooter", propulsion_type=["electric"])
+            for i in range(N)]
+
+
+def test_simulate():
+    events, trips = FleetSimulator(BOUNDARY, 3.5, rng=np.random.default_rng(1)).simulate(devices(50), 7, 10, 0.2)
+
+    assert events["code"].dtype.kind == "i" and events["time"].dtype.kind == "f"
+    assert np.bincount(events["code"], minlength=len(EVENTS))[[SERVICE_START, SERVICE_END]].tolist() == [50, 50]
+    assert (trips["end_time"] > trips["start_time"]).all()
+
+
+def test_simulate_without_hours_or_devices():
+    simulator = FleetSimulator(BOUNDARY, 3.5, rng=np.random.default_rng(1))
+
+    events, trips = simulator.simulate(devices(5), 7, 6, 0.2)
+    assert len(events["code"]) == 10 and len(trips["device"]) == 0
+    assert trips["start_time"].dtype == np.float64
+
+    events, trips = simulator.simulate([], 7, 22, 0.2)
+    assert len(events["code"]) == 0 and len(trips["device"]) == 0
+
+    date = datetime(2019, 1, 1, tzinfo=timezone.utc)
+    assert simulator.service_day([], date, 7, 22, 0.2) == ([], [])
+
+
+def test_service_day_is_reproducible():
+    date = datetime(2019, 1, 1, tzinfo=timezone.utc)
+    days = [FleetSimulator(BOUNDARY, 3.5, rng=np.random.default_rng(7)).service_day(devices(20), date, 7, 12, 0.2)
+            for _ in range(2)]
+
+    assert days[0] == days[1]
+    assert all(BOUNDARY.contains(Point(*sc["event_location"]["geometry"]["coordinates"]))
+               for sc in days[0][0] if sc["event_type_reason"] == "service_start")
@@ -0,0 +1,102 @@
+from conftest import make_schema, point, status_change
+import mds
+from mds.geometry import RouteArray, ZoneIndex, join_status_changes, join_trips
+from mds.json import typed_frame
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import box
+
+
+ZONES = ZoneIndex([box(0, 0, 1, 1), box(1, 0, 2, 1), box(0.5, 0, 1.5, 1)], ids=["a", "b", "c"])
+
+
+def test_locate():
+    located = ZONES.locate([0.25, 1.75, 1.0, 5.0, float("nan")], [0.5, 0.5, 0.5, 5.0, 0.5])
+
+    # the shared border and the overlap go to the first zone, outside and missing points to -1
+    assert located.tolist() == [0, 1, 0, -1, -1]
+
+
+def test_lookup_missing():
+    assert ZONES.lookup([0.25, 5.0], [0.5, 5.0], missing="none").tolist() == ["a", "none"]
+
+
+def test_from_geojson():
+    features = [dict(type="Feature", properties=dict(name=name), geometry=g.__geo_interface__)
+                for name, g in zip(["west", "east"], [box(0, 0, 1, 1), box(1, 0, 2, 1)])]
+    zones = ZoneIndex.from_geojson(dict(type="FeatureCollection", features=features), id_field="name")
+
+    assert zones.lookup([1.5], [0.5]).tolist() == ["east"]
+
+
+def test_join_status_changes():
+    df = pd.DataFrame(dict(event_location=[point(0.25, 0.5, 0), None, point(1.75, 0.5, 0)]))
+    joined = join_status_changes(df, ZONES)
+
+    assert joined["zone_id"].isna().tolist() == [False, True, False]
+    assert joined["zone_id"][[0, 2]].tolist() == ["a", "b"]
+    assert "zone_id" not in df.columns
+
+
+def test_join_typed_status_changes():
+    df = pd.DataFrame.from_records([status_change(event_location=point(x, 0.5, 0)) for x in [0.25, 5.0, 1.75]])
+    joined = join_status_changes(typed_frame(df, make_schema(mds.STATUS_CHANGES)), ZONES)
+
+    assert "event_location" not in joined
+    assert joined["zone_id"][[0, 2]].tolist() == ["a", "b"] and joined["zone_id"].isna()[1]
+
+
+def test_join_trips():
+    routes = [dict(type="FeatureCollection", features=[point(0.25, 0.5, 0), point(9, 9, 1), point(1.75, 0.5, 2)]),
+              dict(type="FeatureCollection", features=[])]
+    joined = join_trips(pd.DataFrame(dict(route=routes)), ZONES)
+
+    assert joined["start_zone_id"][0] == "a" and joined["end_zone_id"][0] == "b"
+    assert joined.loc[1, ["start_zone_id", "end_zone_id"]].isna().all()
+
+
+ROUTES = RouteArray([0.0, 0.0, 0.0, 2.0, 3.0], [0.0, 1.0, 2.0, 2.0, 3.0], [10, 20, 30, 40, np.nan], [0, 3, 3, 5])
+
+
+def test_route_wkb_round_trip():
+    wkbs = ROUTES.take([0, 2]).to_wkb()
+    routes = RouteArray.from_wkb(wkbs)
+
+    assert routes.offsets.tolist() == [0, 3, 5]
+    assert routes.lon.tolist() == [0, 0, 0, 2, 3] and routes.lat.tolist() == [0, 1, 2, 2, 3]
+    assert np.isnan(routes.timestamp).all()
+    assert RouteArray.from_wkb([w.hex() for w in wkbs]).lon.tolist() == routes.lon.tolist()
+
+
+def test_route_ewkb_and_single_points():
+    wkb = RouteArray([1.5], [2.5]).to_wkb(srid=4326)[0]
+    geometry = shapely.from_wkb(wkb)
+
+    assert shapely.get_srid(geometry) == 4326
+    assert shapely.get_coordinates(geometry).tolist() == [[1.5, 2.5], [1.5, 2.5]]
+
+
+def test_route_geojson_round_trip():
+    routes = RouteArray.from_geojson(ROUTES.to_geojson())
+
+    assert routes.offsets.tolist() == ROUTES.offsets.tolist()
+    assert np.array_equal(routes.timestamp, ROUTES.timestamp, equal_nan=True)
+
+
+def test_route_ends_and_lengths():
+    lon, lat, timestamp = ROUTES.ends()
+
+    assert lon[[0, 2]].tolist() == [0, 3] and timestamp[0] == 30
+    assert np.isnan([lon[1], lat[1], timestamp[1]]).all()
+
+    lengths = ROUTES.lengths()
+    assert lengths[1] == 0
+    assert np.isclose(lengths[0], 2 * np.radians(1) * RouteArray.EARTH_RADIUS)
+
+
+def test_route_concat():
+    routes = RouteArray.concat([ROUTES, RouteArray([9.0], [9.0])])
+
+    assert len(routes) == 4 and routes.offsets.tolist() == [0, 3, 3, 5, 6]
+    assert len(RouteArray.concat([])) == 0
@@ -0,0 +1,82 @@
+from conftest import status_change
+import json
+import mds
+from mds.json import PagedJsonWriter, read_data_file, read_data_files
+import numpy as np
+import pandas as pd
+import pickle
+import pytest
+
+
+def write_page(path, records):
+    path.write_text(json.dumps(dict(version="0.3.0", data={mds.STATUS_CHANGES: records}), default=str))
+    return path
+
+
+def test_schema_pickles(status_changes_schema):
+    copy = pickle.loads(pickle.dumps(status_changes_schema))
+
+    assert copy.event_type_reasons() == status_changes_schema.event_type_reasons()
+    assert copy.event_types() == ["available", "reserved"]
+
+
+def test_read_data_files_parallel_matches_serial(tmp_path, status_changes_schema):
+    srcs = [write_page(tmp_path / f"{i}.json", [status_change(), status_change(event_type_reason="user_drop_off")])
+            for i in range(2)]
+
+    versions, df = read_data_files(srcs, mds.STATUS_CHANGES, schema=status_changes_schema, processes=2)
+    _, serial = read_data_file(srcs[0], mds.STATUS_CHANGES, schema=status_changes_schema)
+
+    assert versions == ["0.3.0", "0.3.0"]
+    assert len(df) == 4
+    assert isinstance(df["event_type_reason"].dtype, pd.CategoricalDtype)
+    assert df.dtypes.to_dict() == serial.dtypes.to_dict()
+    assert np.allclose(df["event_lon"], -118.49)
+
+
+def test_paged_writer(tmp_path):
+    records = [status_change(vehicle_id=str(i)) for i in range(5)]
+
+    with PagedJsonWriter(tmp_path, mds.STATUS_CHANGES, page_size=2, base_url="http://test/",
+                         version="0.3.0", date_format="unix") as writer:
+        writer.write(iter(records[:3]))
+        writer.write(records[3:])
+
+    assert [p.name for p in writer.pages] == [f"status_changes_00000{i}.json" for i in range(3)]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [p.name for p in writer.pages]
+
+    payloads = [json.loads(p.read_text()) for p in writer.pages]
+    assert [len(p["data"][mds.STATUS_CHANGES]) for p in payloads] == [2, 2, 1]
+    assert [p.get("links", {}).get("next") for p in payloads] == \
+        ["http://test/status_changes_000001.json", "http://test/status_changes_000002.json", None]
+    assert payloads[0]["data"][mds.STATUS_CHANGES][0]["event_time"] == records[0]["event_time"].timestamp()
+
+    _, df = read_data_files(writer.pages, mds.STATUS_CHANGES)
+    assert df["vehicle_id"].tolist() == [str(i) for i in range(5)]
+
+
+def test_paged_writer_full_and_empty_pages(tmp_path):
+    writer = PagedJsonWriter(tmp_path / "full", mds.TRIPS, page_size=2, version="0.3.0")
+    writer.write([dict(trip_id=str(i)) for i in range(4)])
+    pages = writer.close()
+
+    # a full last page doesn't link to an empty one
+    assert len(pages) == 2 and "links" not in json.loads(pages[-1].read_text())
+
+    pages = PagedJsonWriter(tmp_path / "empty", mds.TRIPS, version="0.3.0").close()
+    assert json.loads(pages[0].read_text())["data"] == {mds.TRIPS: []}
+
+    with pytest.raises(ValueError):
+        PagedJsonWriter(tmp_path, mds.TRIPS, page_size=0)
+
+
+def test_typed_frame_keeps_unknown_enum_values(tmp_path, status_changes_schema, capsys):
+    src = write_page(tmp_path / "page.json", [status_change(), status_change(event_type_reason="rebalance_drop_off"),
+                                              status_change(vehicle_type="moped")])
+
+    _, df = read_data_file(src, mds.STATUS_CHANGES, schema=status_changes_schema)
+
+    assert df["event_type_reason"].tolist() == ["service_start", "rebalance_drop_off", "service_start"]
+    assert df["vehicle_type"].tolist() == ["scooter", "scooter", "moped"]
+    assert "service_start" in df["event_type_reason"].cat.categories
+    assert "rebalance_drop_off" in capsys.readouterr().out
@@ -0,0 +1,31 @@
+import mds
+from mds.db.ledger import LoadLedger, file_digest, page_digest
+import sqlalchemy
+
+
+def test_page_digest_ignores_key_order():
+    assert page_digest(dict(a=1, b=[1, 2])) == page_digest(dict(b=[1, 2], a=1))
+    assert page_digest(dict(a=1)) != page_digest(dict(a=2))
+
+
+def test_file_digest(tmp_path):
+    path = tmp_path / "page.json"
+    path.write_text("{}")
+
+    assert file_digest(path) == file_digest(str(path))
+
+
+def test_ledger_creates_table_on_first_use(tmp_path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'ledger.db'}")
+    ledger = LoadLedger(engine)
+
+    assert not ledger.contains(mds.TRIPS, "page 1", "abc")
+
+    ledger.add(mds.TRIPS, [("page 1", "abc", 10), ("page 1", "abc", 10)])
+
+    assert ledger.contains(mds.TRIPS, "page 1", "abc")
+    assert not ledger.contains(mds.TRIPS, "page 1", "def")
+    assert not ledger.contains(mds.STATUS_CHANGES, "page 1", "abc")
+
+    # a new ledger reads the loaded sources back from the table
+    assert LoadLedger(engine).contains(mds.TRIPS, "page 1", "abc")
@@ -0,0 +1,193 @@
+from contextlib import contextmanager
+import mds
+from mds.db import ProviderDataLoader, ProviderDataLoadError, sql
+from mds.db.ledger import LoadLedger, page_digest
+import pandas as pd
+import pytest
+import sqlalchemy
+from types import SimpleNamespace
+
+
+@pytest.fixture
+def loader(tmp_path, monkeypatch):
+    """
+    A loader that writes the trip_id and batch number of the records it loads to a `loaded` table,
+    failing on "bad" records after writing them.
+    """
+    loader = ProviderDataLoader(engine=sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'mds.db'}"))
+    with loader.engine.begin() as conn:
+        conn.execute(sqlalchemy.text("CREATE TABLE loaded (trip_id TEXT, batch INTEGER)"))
+
+    def load_from_records(records, record_type, table, before_load=None, stage_first=True):
+        with loader._transaction() as conn:
+            batch = conn.execute(sqlalchemy.text("SELECT coalesce(max(batch), -1) + 1 FROM loaded")).scalar()
+            conn.execute(sqlalchemy.text("INSERT INTO loaded VALUES (:trip_id, :batch)"),
+                         [dict(trip_id=r["trip_id"], batch=batch) for r in records])
+            if any(r.get("bad") for r in records):
+                raise ValueError("bad record")
+
+    monkeypatch.setattr(loader, "load_from_records", load_from_records)
+    return loader
+
+
+def batches(loader):
+    """
+    Get the list of trip_ids committed by each batch of the :loader:.
+    """
+    with loader.engine.connect() as conn:
+        rows = conn.execute(sqlalchemy.text("SELECT batch, trip_id FROM loaded ORDER BY batch, rowid")).all()
+    return [[trip_id for b, trip_id in rows if b == batch] for batch in sorted(set(b for b, _ in rows))]
+
+
+def pages(*sizes, bad=None):
+    """
+    Create data pages of trips with :sizes: records, where page :bad: has an invalid record.
+    """
+    return [dict(version="0.3.0", data={mds.TRIPS: [dict(trip_id=f"{p}-{i}", bad=p == bad) for i in range(n)]})
+            for p, n in enumerate(sizes)]
+
+
+def test_pages_are_coalesced_into_batches(loader):
+    loader.load_from_source(pages(2, 2, 2, 1), mds.TRIPS, mds.TRIPS, batch_size=4)
+
+    assert [len(b) for b in batches(loader)] == [4, 3]
+
+
+def test_failed_batch_names_the_bad_page(loader):
+    with pytest.raises(ProviderDataLoadError) as e:
+        loader.load_from_source(pages(2, 2, 2, 2, 2, 2, bad=2), mds.TRIPS, mds.TRIPS, batch_size=4)
+
+    # the first batch committed, nothing of the failing batch (or after it) did
+    assert batches(loader) == [["0-0", "0-1", "1-0", "1-1"]]
+    assert e.value.origin == "source, page 2" and e.value.origins == ["source, page 2"]
+    assert isinstance(e.value.error, ValueError)
+
+
+def test_failed_batch_names_each_bad_page(loader):
+    sources = pages(1, 1, 1, 1)
+    for p in [1, 3]:
+        sources[p]["data"][mds.TRIPS][0]["bad"] = True
+
+    with pytest.raises(ProviderDataLoadError) as e:
+        loader.load_from_source(sources, mds.TRIPS, mds.TRIPS, batch_size=10)
+
+    assert e.value.origins == ["source, page 1", "source, page 3"]
+    assert "2 pages" in str(e.value)
+    assert batches(loader) == []
+
+
+class PostgresEngine():
+    """
+    Stands in for a PostgreSQL engine, recording the statements executed on it.
+    """
+
+    dialect = SimpleNamespace(name="postgresql", driver="psycopg2")
+
+    def __init__(self, partitioned):
+        self.partitioned = partitioned
+        self.statements = []
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    begin = connect
+
+    def execute(self, statement):
+        self.statements.append(str(statement))
+        return SimpleNamespace(scalar=lambda: self.partitioned)
+
+
+@pytest.mark.parametrize("partitioned", [True, False])
+def test_default_loader_creates_partitions_of_partitioned_tables(monkeypatch, partitioned):
+    engine = PostgresEngine(partitioned)
+    loader = ProviderDataLoader(engine=engine)
+    monkeypatch.setattr(loader, "_upsert", lambda df, record_type, table: None)
+
+    df = pd.DataFrame(dict(trip_id=["a", "b", "c"], start_time=[1546300800, 1548979200, 1548979300]))
+    for _ in range(2):
+        loader.load_from_df(df, mds.TRIPS, mds.TRIPS)
+
+    # the table is checked once, and each month's partition created once
+    created = [s for s in engine.statements if "PARTITION OF" in s]
+    assert sum("pg_partitioned_table" in s for s in engine.statements) == 1
+    assert len(created) == (2 if partitioned else 0)
+    assert all('"trips"' in s for s in created)
+    if partitioned:
+        assert '"trips_2019_01"' in created[0] and '"trips_2019_02"' in created[1]
+
+
+def test_partitions_option_overrides_the_check(monkeypatch):
+    engine = PostgresEngine(True)
+    loader = ProviderDataLoader(engine=engine, partitions=False)
+    monkeypatch.setattr(loader, "_upsert", lambda df, record_type, table: None)
+
+    loader.load_from_df(pd.DataFrame(dict(trip_id=["a"], start_time=[1546300800])), mds.TRIPS, mds.TRIPS)
+
+    assert engine.statements == []
+
+
+def partitioned_pages(bad_day=None):
+    """
+    Create data pages of trips over 3 days, where the records of :bad_day: are invalid.
+    """
+    return [dict(version="0.3.0", data={mds.TRIPS: [
+        dict(trip_id=f"{day}-{i}", provider_id="p", start_time=1546300800 + day * 86400 + i, bad=day == bad_day)
+        for i in range(3)]}) for day in range(3)]
+
+
+def loaded(loader):
+    return sorted(trip_id for batch in batches(loader) for trip_id in batch)
+
+
+def test_load_partitioned(loader):
+    loader.ledger = LoadLedger(loader.engine)
+
+    results = loader.load_partitioned(partitioned_pages(), mds.TRIPS, mds.TRIPS, batch_size=2, workers=2)
+
+    assert [r["partition"] for r in results] == [("p", 17897), ("p", 17898), ("p", 17899)]
+    assert [r["rows"] for r in results] == [3, 3, 3] and not any("error" in r for r in results)
+    assert len(loaded(loader)) == 9
+    assert loader.ledger.contains(mds.TRIPS, "source, page 0", page_digest(partitioned_pages()[0]))
+
+
+def test_failed_partition_leaves_the_others(loader, capsys):
+    loader.ledger = LoadLedger(loader.engine)
+
+    results = loader.load_partitioned(partitioned_pages(bad_day=1), mds.TRIPS, mds.TRIPS, batch_size=2, workers=2)
+
+    # the other partitions committed, the failed one didn't
+    assert loaded(loader) == ["0-0", "0-1", "0-2", "2-0", "2-1", "2-2"]
+    assert [type(r.get("error")) for r in results] == [type(None), ValueError, type(None)]
+    assert "Failed to load partition ('p', 17898): bad record" in capsys.readouterr().out
+
+    # sources span partitions, so none are recorded as loaded
+    for i, page in enumerate(partitioned_pages(bad_day=1)):
+        assert not loader.ledger.contains(mds.TRIPS, f"source, page {i}", page_digest(page))
+
+
+def test_stage_copies_csv(tmp_path):
+    loader = ProviderDataLoader(engine=sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'mds.db'}"), copy=True)
+    copied = []
+    cursor = SimpleNamespace(copy_expert=lambda statement, f: copied.append((statement, f.read())))
+    conn = SimpleNamespace(connection=SimpleNamespace(cursor=lambda: cursor))
+
+    df = pd.DataFrame(dict(vehicle_id=["é", ""], battery_pct=[0.5, None]))
+    size = loader._stage(df, "stage", conn)
+
+    assert copied == [(sql.copy_from("stage", ["vehicle_id", "battery_pct"]), "é,0.5\n,\\N\n")]
+    # bytes, not characters
+    assert size == len("é,0.5\n,\\N\n".encode()) == 11
+
+
+def test_staging_tables_are_reused_by_shape(tmp_path):
+    loader = ProviderDataLoader(engine=sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'mds.db'}"))
+    df = pd.DataFrame(dict(vehicle_id=["a"], battery_pct=[0.5]))
+
+    with loader.engine.begin() as conn:
+        temp = loader._staging_table(conn, df, mds.TRIPS)
+        assert loader._staging_table(conn, df.iloc[:0], mds.TRIPS) == temp
+        assert loader._staging_table(conn, df[["vehicle_id"]], mds.TRIPS) != temp
+
+        loader._stage(df, temp, conn)
+        assert conn.execute(sqlalchemy.text(f'SELECT vehicle_id, battery_pct FROM "{temp}"')).all() == [("a", 0.5)]
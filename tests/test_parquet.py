@@ -0,0 +1,27 @@
+from conftest import status_change
+import mds
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+from mds.parquet import read_parquet, to_table, write_parquet
+
+
+def test_to_table_missing_associated_trips():
+    df = pd.DataFrame.from_records([status_change(associated_trips=["a"]), status_change()])
+    table = to_table(df, mds.STATUS_CHANGES)
+
+    assert table["associated_trips"].to_pylist() == [["a"], None]
+    assert table["event_lon"].to_pylist() == [-118.49, -118.49]
+    assert table["date"].to_pylist() == ["2019-01-01", "2019-01-01"]
+
+
+def test_write_read_round_trip(tmp_path):
+    records = [status_change(associated_trips=["a", "b"]), status_change(), status_change(associated_trips=None)]
+    write_parquet(records, mds.STATUS_CHANGES, tmp_path)
+
+    df = read_parquet(tmp_path, mds.STATUS_CHANGES)
+
+    assert len(df) == 3
+    assert sorted(len(t) if t is not None else 0 for t in df["associated_trips"]) == [0, 0, 2]
+    assert set(df["provider_name"]) == {"Test"}
@@ -0,0 +1,83 @@
+from conftest import status_change
+import mds
+from mds.pipeline import ProviderPipeline
+from mds.schema.validation import ProviderDataValidator
+import pytest
+from types import SimpleNamespace
+
+
+PROVIDER = SimpleNamespace(provider_name="Test")
+
+
+def page(records):
+    return dict(version="0.3.0", data={mds.STATUS_CHANGES: records})
+
+
+class Client():
+    def __init__(self, pages, error=None):
+        self.pages, self.error = pages, error
+
+    def get_status_changes(self, stream=False, **kwargs):
+        for p in self.pages:
+            yield PROVIDER, p
+        if self.error is not None:
+            raise self.error
+
+
+class Loader():
+    def __init__(self, error=None):
+        self.pages, self.error = [], error
+
+    def load_status_changes(self, sources, table=None, before_load=None, batch_size=None):
+        for provider, p in sources:
+            if self.error is not None:
+                raise self.error
+            self.pages.append(p)
+
+
+def validate(pages, schema):
+    pipeline = ProviderPipeline(None, None, validator=ProviderDataValidator(schema))
+    return [p for _, p in pipeline._validate([(PROVIDER, p) for p in pages], mds.STATUS_CHANGES)]
+
+
+def test_validate_drops_invalid_records(status_changes_schema):
+    missing = status_change(vehicle_id="missing")
+    del missing["provider_id"]
+    records = [status_change(vehicle_id="1"), missing, status_change(vehicle_id="bad", battery_pct="full"),
+               status_change(vehicle_id="2")]
+
+    validated = validate([page(records)], status_changes_schema)
+
+    # a missing property fails at data.status_changes[i], a bad value at data.status_changes[i].field
+    assert [r["vehicle_id"] for r in validated[0]["data"][mds.STATUS_CHANGES]] == ["1", "2"]
+    assert validated[0]["version"] == "0.3.0"
+
+
+def test_validate_skips_invalid_pages(status_changes_schema):
+    invalid = page([status_change()])
+    del invalid["version"]
+
+    assert validate([invalid, page([status_change()])], status_changes_schema) == [page([status_change()])]
+
+
+def test_run_loads_pages():
+    loader = Loader()
+    ProviderPipeline(Client([page([status_change()])] * 3), loader, queue_size=1).run(mds.STATUS_CHANGES)
+
+    assert len(loader.pages) == 3
+
+
+def test_run_raises_fetch_errors():
+    loader = Loader()
+    pipeline = ProviderPipeline(Client([page([status_change()])], error=IOError("fetch")), loader)
+
+    with pytest.raises(IOError, match="fetch"):
+        pipeline.run(mds.STATUS_CHANGES)
+    assert len(loader.pages) == 1
+
+
+def test_run_raises_load_errors():
+    pipeline = ProviderPipeline(Client([page([status_change()])] * 10), Loader(error=ValueError("load")), queue_size=1)
+
+    with pytest.raises(ValueError, match="load"):
+        pipeline.run(mds.STATUS_CHANGES)
@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+from mds.db import ProviderDataReader
+import numpy as np
+import pandas as pd
+import sqlalchemy
+
+
+def reader(tmp_path):
+    return ProviderDataReader(engine=sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'mds.db'}"))
+
+
+def test_utc(tmp_path):
+    expected = datetime(2019, 1, 1)
+
+    assert reader(tmp_path)._utc(1546300800) == expected
+    assert reader(tmp_path)._utc(datetime(2019, 1, 1, tzinfo=timezone.utc)) == expected
+    assert reader(tmp_path)._utc(expected) == expected
+
+
+def test_typed(tmp_path):
+    df = pd.DataFrame(dict(device_id=["a", "b", "a"], event_type=["available", "reserved", "available"],
+                           event_time=[datetime(2019, 1, 1, h) for h in range(3)],
+                           event_lon=[1.5, 2.5, 3.5], trip_duration=[1, 2, 3]))
+
+    typed = reader(tmp_path)._typed(df)
+
+    assert isinstance(typed["device_id"].dtype, pd.CategoricalDtype)
+    assert list(typed["event_type"].cat.categories) == ["available", "reserved"]
+    assert str(typed["event_time"].dtype) == "datetime64[ms, UTC]"
+    assert typed["event_time"][1] == pd.Timestamp("2019-01-01 01:00", tz="UTC")
+    assert typed["event_lon"].dtype == np.float32
+    assert typed["trip_duration"].dtype == np.int64
@@ -0,0 +1,49 @@
+from datetime import date
+from mds.fake.shards import generate, seed_sequence, shard_random
+import pytest
+from shapely.geometry import Point
+
+
+BOUNDARY = Point(-118.49, 34.02).buffer(0.05)
+
+DAYS = [date(2019, 1, 1), date(2019, 1, 2)]
+
+
+def shards(providers, days, **kwargs):
+    """
+    Generate the shards of :providers: on :days:, keyed by (provider, day).
+    """
+    results = generate(BOUNDARY, providers, days, seed=42, speed=3.5, hour_open=7, hour_closed=10,
+                       vehicle_types=["scooter"], propulsion_types=["electric"], **kwargs)
+    return {(provider, day): (status_changes, trips) for provider, day, status_changes, trips in results}
+
+
+def test_seed_sequence():
+    state = seed_sequence(42, "Test", DAYS[0]).generate_state(4).tolist()
+
+    assert state == seed_sequence(42, "Test", DAYS[0]).generate_state(4).tolist()
+    assert state != seed_sequence(42, "Test", DAYS[1]).generate_state(4).tolist()
+    assert state != seed_sequence(42, "Other", DAYS[0]).generate_state(4).tolist()
+    assert state != seed_sequence(43, "Test", DAYS[0]).generate_state(4).tolist()
+
+    py_rng, np_rng = shard_random(42, "Test", DAYS[0])
+    assert py_rng.random() == shard_random(42, "Test", DAYS[0])[0].random()
+    assert np_rng.random() == shard_random(42, "Test", DAYS[0])[1].random()
+
+
+@pytest.mark.parametrize("fleet", [False, True], ids=["generator", "fleet"])
+def test_shards_are_independent(fleet):
+    all_shards = shards(dict(A=5, B=5), DAYS, fleet=fleet, processes=1)
+    one_shard = shards(dict(B=5), DAYS[1:], fleet=fleet, processes=1)
+
+    assert list(all_shards) == [("A", DAYS[0]), ("A", DAYS[1]), ("B", DAYS[0]), ("B", DAYS[1])]
+    assert one_shard[("B", DAYS[1])] == all_shards[("B", DAYS[1])]
+    assert all_shards[("B", DAYS[0])] != all_shards[("B", DAYS[1])]
+
+    # the fleet is the same on every day
+    devices = [set(sc["device_id"] for sc in all_shards[("A", day)][0]) for day in DAYS]
+    assert devices[0] == devices[1] and len(devices[0]) == 5
+
+
+def test_shards_match_across_processes():
+    assert shards(dict(A=3, B=3), DAYS, processes=2) == shards(dict(A=3, B=3), DAYS, processes=1)
@@ -0,0 +1,81 @@
+from conftest import status_change
+import json
+import mds
+from mds.spool import PageSpool
+import pytest
+import threading
+
+
+def page(n, reason="service_start"):
+    records = [status_change(vehicle_id=f"V{i}", event_type_reason=reason) for i in range(n)]
+    return json.loads(json.dumps(dict(version="0.3.0", data={mds.STATUS_CHANGES: records}), default=str))
+
+
+def test_append_and_read(tmp_path):
+    spool = PageSpool(tmp_path)
+    entries = [spool.append("Test Provider", page(n)) for n in (1, 2, 3)]
+
+    assert spool.providers() == ["Test_Provider"]
+    assert [e["records"] for e in spool.entries()] == [1, 2, 3]
+    assert [e["record_type"] for e in entries] == [mds.STATUS_CHANGES] * 3
+    assert [p for _, p in spool.pages()] == [page(n) for n in (1, 2, 3)]
+
+
+def test_segments_roll_over(tmp_path):
+    spool = PageSpool(tmp_path, segment_bytes=1)
+    spool.spool({"Test": [page(1), page(2)]})
+
+    assert [e["segment"] for e in spool.entries()] == [0, 1]
+    assert [len(p["data"][mds.STATUS_CHANGES]) for _, p in spool.pages()] == [1, 2]
+
+
+def test_resume_truncates_unindexed_tail(tmp_path):
+    spool = PageSpool(tmp_path)
+    spool.append("Test", page(1))
+    spool.close()
+
+    # an interrupted append leaves bytes that were never indexed
+    with open(tmp_path / "Test" / "00000000.spool", "ab") as f:
+        f.write(b"partial")
+
+    spool = PageSpool(tmp_path)
+    spool.append("Test", page(2))
+
+    assert [len(p["data"][mds.STATUS_CHANGES]) for _, p in spool.pages()] == [1, 2]
+
+
+def test_read_detects_corruption(tmp_path):
+    spool = PageSpool(tmp_path)
+    entry = spool.append("Test", page(1))
+    spool.close()
+
+    with open(tmp_path / "Test" / "00000000.spool", "r+b") as f:
+        f.seek(entry["offset"] + 10)
+        f.write(b"\xff\xff")
+
+    with pytest.raises(ValueError):
+        PageSpool(tmp_path).read(entry)
+
+
+def test_concurrent_reads_while_appending(tmp_path):
+    spool = PageSpool(tmp_path)
+    entries = [spool.append("Test", page(5))]
+    errors = []
+
+    def reader():
+        try:
+            for _ in range(200):
+                for entry in list(entries):
+                    assert len(spool.read(entry)["data"][mds.STATUS_CHANGES]) == 5
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for _ in range(50):
+        entries.append(spool.append("Test", page(5)))
+    for t in threads:
+        t.join()
+
+    assert errors == []
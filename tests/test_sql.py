@@ -0,0 +1,72 @@
+import mds
+from mds.db import sql
+import re
+
+
+def group_by(statement):
+    """
+    Get the lists of column positions in each GROUP BY of :statement:.
+    """
+    return [[int(c) for c in g.split(",")] for g in re.findall(r"GROUP BY ([\d, ]+)", statement)]
+
+
+def test_rollup_status_changes_groups_by_key():
+    statement = sql.rollup_status_changes("stage")
+
+    assert "max(provider_name)" in statement
+    assert group_by(statement) == [[1, 3, 4, 5]]
+    assert "ON CONFLICT (provider_id, hour, event_type, event_type_reason)" in statement
+
+
+def test_rollup_trips_groups_by_key():
+    statement = sql.rollup_trips("stage")
+
+    assert "max(provider_name)" in statement
+    assert group_by(statement) == [[1, 3]]
+    assert "ON CONFLICT (provider_id, hour)" in statement
+
+
+def test_insert_sql_is_dialect_aware():
+    assert "ORDER BY trip_id" in sql.insert_trips_from("stage")
+    assert "ORDER BY" not in sql.insert_trips_from("stage", dialect="duckdb")
+    assert "ORDER BY" not in sql.insert_status_changes_from("stage", dialect="duckdb")
+
+
+def where(statement):
+    """
+    Get the conditions of the WHERE clause of :statement:.
+    """
+    match = re.search(r"WHERE (.*);", statement)
+    return match.group(1).split(" AND ") if match else []
+
+
+def test_select_records_pushes_down_filters():
+    assert where(sql.select_records(mds.STATUS_CHANGES)) == []
+
+    statement = sql.select_records(mds.STATUS_CHANGES, start_time=0, end_time=1, providers=["a"])
+    assert where(statement) == ["event_time >= :start_time", "event_time < :end_time",
+                                "provider_id::TEXT = ANY(:providers)"]
+    assert where(sql.select_records(mds.TRIPS, "t", end_time=1)) == ["start_time < :end_time"]
+    assert 'FROM "t"' in sql.select_records(mds.TRIPS, "t")
+
+
+def test_select_records_columns():
+    statement = sql.select_records(mds.STATUS_CHANGES, columns=["device_id", "event_location", "battery_pct"])
+
+    assert "device_id::TEXT AS device_id" in statement
+    assert "AS event_lon" in statement and "AS event_lat" in statement
+    assert "event_location->'geometry'" in statement
+    assert "provider_name" not in statement and "battery_pct" in statement
+
+
+def test_select_records_postgis():
+    statement = sql.select_records(mds.STATUS_CHANGES, columns=["event_location"], postgis=True)
+    assert "ST_X(event_location) AS event_lon, ST_Y(event_location) AS event_lat" in statement
+
+    assert "ST_AsBinary(route) AS route" in sql.select_records(mds.TRIPS, columns=["route"], postgis=True)
+    assert "route::TEXT AS route" in sql.select_records(mds.TRIPS, columns=["route"])
+
+
+def test_copy_from():
+    assert sql.copy_from("stage", ["a", "b"]) == \
+        r"""COPY "stage" ("a", "b") FROM STDIN WITH (FORMAT csv, NULL '\N')"""
@@ -0,0 +1,81 @@
+import mds
+from mds.db import ProviderDataLoader
+from mds.db.stats import LoadStats
+import pytest
+import sqlalchemy
+
+
+def test_add_and_summary():
+    events = []
+    stats = LoadStats(mds.TRIPS, "trips", hook=events.append)
+
+    stats.add("upsert", 1.0, rows=10, inserted=8)
+    stats.add("parse", 0.5, rows=10, bytes=None)
+    stats.add("upsert", 1.0, rows=5, inserted=5)
+    with stats.time("custom", rows=1) as counters:
+        counters["extra"] = 2
+
+    summary = stats.summary()
+    assert list(summary) == ["parse", "upsert", "custom"]
+    assert summary["upsert"] == dict(calls=2, seconds=2.0, rows=15, inserted=13)
+    assert summary["parse"] == dict(calls=1, seconds=0.5, rows=10)
+    assert summary["custom"]["extra"] == 2
+
+    assert len(events) == 4
+    assert events[0] == dict(record_type=mds.TRIPS, table="trips", stage="upsert", seconds=1.0, rows=10, inserted=8)
+
+
+def test_report():
+    stats = LoadStats(mds.TRIPS, "trips")
+    stats.add("parse", 1.0, rows=1000, bytes=2048)
+    stats.add("upsert", 3.0, rows=1000)
+    stats.seconds = 4.0
+
+    lines = stats.report().splitlines()
+
+    assert lines[0] == "Loaded trips into trips in 4.00s"
+    assert lines[1].split() == ["parse", "1.00s", "25.0%", "rows=1,000,", "bytes=2,048", "(1,000", "rows/s)"]
+    assert lines[2].split()[:3] == ["upsert", "3.00s", "75.0%"]
+
+
+@pytest.fixture
+def loader(tmp_path, monkeypatch):
+    """
+    A loader collecting the stages of its loads, timing a stand-in upsert.
+    """
+    loader = ProviderDataLoader(engine=sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'mds.db'}"),
+                                dedup=True, on_stage=lambda event: loader.events.append(event))
+    loader.events = []
+
+    def _upsert(df, record_type, table):
+        with loader._time("upsert", rows=len(df)):
+            pass
+
+    monkeypatch.setattr(loader, "_upsert", _upsert)
+    return loader
+
+
+def page(*trip_ids):
+    return dict(version="0.3.0", data={mds.TRIPS: [dict(trip_id=t) for t in trip_ids]})
+
+
+def test_loader_collects_stats_per_load(loader, capsys):
+    loader.profile = True
+    loader.load_from_source([page("a", "b"), page("c"), page("a", "d")], mds.TRIPS, mds.TRIPS, batch_size=2)
+
+    # batches of the load add to a single set of stats
+    summary = loader.last_stats.summary()
+    assert list(summary) == ["frame", "dedup", "upsert"]
+    assert summary["frame"]["calls"] == 2 and summary["frame"]["rows"] == 5
+    assert summary["dedup"]["rows"] == 5 and summary["dedup"]["new"] == 4
+    assert summary["upsert"]["rows"] == 4
+    assert [e["stage"] for e in loader.events] == ["frame", "dedup", "upsert"] * 2
+    assert all(e["table"] == mds.TRIPS for e in loader.events)
+    assert loader.last_stats.seconds is not None
+    assert capsys.readouterr().out.startswith("Loaded trips into trips in ")
+
+    # the next load starts new stats
+    first = loader.last_stats
+    loader.load_from_source(page("e"), mds.TRIPS, mds.TRIPS)
+    assert loader.last_stats is not first
+    assert loader.last_stats.summary()["frame"]["rows"] == 1
@@ -0,0 +1,66 @@
+from conftest import point as feature
+import json
+from mds.db import transform
+from mds.db.transform import STATUS_CHANGES_COLS, TRIPS_COLS, RecordTransform
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(params=["orjson", "json"])
+def codec(request, monkeypatch):
+    """
+    Run with both JSON codecs, skipping orjson when it isn't installed.
+    """
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(transform, "orjson", None)
+    return request.param
+
+
+def test_json_strings(codec):
+    values = [feature(-118.49, 34.02, 1546300800), None, float("nan"), dict(a=(1, 2))]
+    strings = transform.json_strings(values)
+
+    assert json.loads(strings[0]) == values[0]
+    assert strings[1] is None and strings[2] is None
+    assert json.loads(strings[3]) == dict(a=[1, 2])
+
+
+def test_status_changes_transform(codec):
+    df = pd.DataFrame.from_records([
+        dict(event_type="available", event_location=feature(-118.49, 34.02, 1), associated_trips=["a"]),
+        dict(event_type="reserved", event_location=feature(-118.48, 34.01, 2), extra=1)
+    ])
+    result = RecordTransform.StatusChanges()(df)
+
+    assert list(result.columns) == STATUS_CHANGES_COLS + ["extra"]
+    assert list(result["associated_trips"]) == [["a"], []]
+    assert json.loads(result["event_location"][1])["geometry"]["coordinates"] == [-118.48, 34.01]
+    assert result["battery_pct"].isna().all()
+
+
+def test_trips_transform_postgis():
+    route = dict(type="FeatureCollection", features=[feature(-118.49, 34.02, 1), feature(-118.48, 34.01, 2)])
+    df = pd.DataFrame.from_records([dict(trip_id="t", route=route)])
+    result = RecordTransform.Trips(postgis=True)(df)
+
+    assert list(result.columns) == TRIPS_COLS
+    # little-endian EWKB LineString with SRID 4326 and 2 points
+    assert result["route"][0].startswith("0102000020e610000002000000")
+
+
+def test_array_literals():
+    literals = transform.array_literals([["a", 'b"c'], None, ("d",)], brackets="[]")
+
+    assert list(literals) == ['["a","b\\"c"]', None, '["d"]']
+
+
+def test_copy_csv():
+    df = pd.DataFrame(dict(text=["a", "", None, 'say "hi", é'], number=[1.5, None, 2.0, 3.0],
+                           items=[["x", 'y"'], [], None, ["z"]]))
+
+    lines = transform.copy_csv(df).splitlines()
+
+    # NULLs are marked, so empty strings and empty arrays stay distinct from them
+    assert lines == [r'a,1.5,"{""x"",""y\""""}"', r",\N,{}", r"\N,2.0,\N", '"say ""hi"", é",3.0,"{""z""}"']